@@ -1,3 +1,26 @@
-from dotenv import load_dotenv
+import os
 
-load_dotenv()
+_env_loaded = False
+
+
+def load_env() -> None:
+    # dotenv só é carregado quando alguém pede configuração (não no import)
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _env_loaded = True
+
+
+def get_env(name: str, default=None):
+    load_env()
+    return os.getenv(name, default)
+
+
+def get_int_env(name: str, default: int) -> int:
+    raw = get_env(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    return int(raw)
@@ -1,21 +1,104 @@
-import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL não definida")
+from app.config import get_env, get_int_env
+from app.logs import sql_comment_request_id
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    connect_args={
-        "prepare_threshold": 0,   # <-- SEMPRE int
-    },
-)
+# engine é criado no lifespan do FastAPI (init_engine), não no import:
+# o container sobe mais rápido e a falta de DATABASE_URL aparece no startup.
+engine = None
 
 SessionLocal = sessionmaker(
-    bind=engine,
     autoflush=False,
     autocommit=False,
 )
+
+
+def init_engine():
+    global engine
+    if engine is not None:
+        return engine
+
+    database_url = get_env("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL não definida")
+
+    # SQL_REQUEST_ID_COMMENTS=1 liga /* request_id=... */ em cada SQL (correlação
+    # com logs do Postgres). Desligado por padrão: o texto de cada statement fica
+    # único por request, então preparar (prepare_threshold=0) só giraria o cache
+    # do psycopg e o prepare precisa ser desligado.
+    sql_comments = get_env("SQL_REQUEST_ID_COMMENTS", "0") == "1"
+
+    engine = create_engine(
+        database_url,
+        pool_pre_ping=True,
+        pool_size=get_int_env("DB_POOL_SIZE", 5),
+        max_overflow=get_int_env("DB_MAX_OVERFLOW", 10),
+        connect_args={
+            "prepare_threshold": None if sql_comments else 0,   # <-- int ou None (desligado)
+            # banco inalcançável falha rápido em vez de travar warmup e /health?ready=1
+            "connect_timeout": get_int_env("DB_CONNECT_TIMEOUT", 5),
+        },
+    )
+    if sql_comments:
+        event.listen(engine, "before_cursor_execute", sql_comment_request_id, retval=True)
+
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_db():
+    """
+    Dependência FastAPI: uma Session por request, rollback se o endpoint
+    levantar qualquer exceção (inclusive HTTPException) e close sempre.
+    Exceções seguem adiante; o 500 é montado no RequestContextMiddleware.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def warmup(n: int, statements=()) -> int:
+    """
+    Abre n conexões do pool ao mesmo tempo e executa os statements em cada uma,
+    para que as conexões, o cache de compilação do SQLAlchemy e (com
+    prepare_threshold=0) os prepared statements já estejam prontos no primeiro
+    request. Retorna quantas abriram.
+    """
+    if engine is None or n <= 0:
+        return 0
+
+    conns = []
+    try:
+        for _ in range(n):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.execute(text("SELECT 1"))
+            for stmt, params in statements:
+                conn.execute(stmt, params)
+            conn.rollback()
+    finally:
+        # devolve todas ao pool (ficam abertas até pool_size)
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+def ping() -> None:
+    """Checagem barata de alcance do banco (levanta exceção se falhar)."""
+    if engine is None:
+        raise RuntimeError("engine não inicializado")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def dispose_engine() -> None:
+    global engine
+    if engine is not None:
+        engine.dispose()
+        engine = None
@@ -0,0 +1,223 @@
+"""
+Checagem de planos: roda EXPLAIN em todas as queries de app/main.py e falha se
+alguma query com WHERE cair em Seq Scan.
+
+    DATABASE_URL=... python -m app.migrate
+    DATABASE_URL=... python -m app.explain_check [arquivo.py ...]
+
+As queries são extraídas do código: chamadas text("...") com string literal e
+também text(sql) / text(sql + "...") quando `sql` é montado na mesma função só
+com literais (inclusive `sql += " AND ..."`). Nos UPDATE com SET dinâmico
+(f-string) só o WHERE é fixo: ele é checado como SELECT 1 FROM tabela WHERE ...
+O resto (INSERT com colunas dinâmicas etc.) é listado como SKIP e não é checado.
+
+Roda com enable_seqscan = off: assim o resultado não depende do volume do banco
+local — se ainda assim o plano usar Seq Scan, é porque não existe índice que
+atenda o filtro. Queries sem WHERE (listagens completas) podem ler a tabela toda.
+"""
+import ast
+import re
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app import db as db_module
+
+DEFAULT_SOURCES = [Path(__file__).resolve().parent / "main.py"]
+
+_PARAM_RE = re.compile(r"(?<!:):([A-Za-z_]\w*)")
+_WHERE_RE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+_DML_RE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+_DUMMY_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+_HOLE = "\x00"  # marca o trecho de uma f-string que só existe em runtime
+_UPDATE_WHERE_RE = re.compile(r"^\s*UPDATE\s+(\w+)\s+SET\s.*?\bWHERE\b(.*)$", re.IGNORECASE | re.DOTALL)
+_RETURNING_RE = re.compile(r"\bRETURNING\b.*$", re.IGNORECASE | re.DOTALL)
+
+
+def _resolve_sql(node, assigns: dict):
+    """Texto do SQL de um nó (trechos de f-string viram _HOLE). None se não der para resolver."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return "".join(v.value if isinstance(v, ast.Constant) else _HOLE for v in node.values)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _resolve_sql(node.left, assigns), _resolve_sql(node.right, assigns)
+        return None if left is None or right is None else left + right
+    if isinstance(node, ast.Name) and node.id in assigns:
+        parts = [_resolve_sql(v, assigns) for v in assigns[node.id]]
+        return None if None in parts else "".join(parts)
+    return None
+
+
+def _local_assigns(func) -> dict:
+    """nome -> [valor inicial, incrementos `+=`...] das variáveis da função."""
+    assigns = {}
+    for node in ast.walk(func):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            assigns.setdefault(node.targets[0].id, [node.value])
+        elif isinstance(node, ast.AugAssign) and isinstance(node.op, ast.Add) and isinstance(node.target, ast.Name):
+            assigns.setdefault(node.target.id, []).append(node.value)
+    return assigns
+
+
+def extract_queries(path: Path) -> list:
+    """
+    Retorna [(linha, sql | None, obs)] das chamadas text(...) do arquivo.
+    sql None = não checável (obs diz o motivo); obs preenchido com sql = template do WHERE.
+    """
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    scopes = [tree] + [n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+    # constantes de módulo (ex.: ESTACA_SELECT_SQL) valem em qualquer escopo
+    module_assigns = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            module_assigns[node.targets[0].id] = [node.value]
+
+    found = {}
+    for scope in scopes:
+        assigns = module_assigns if scope is tree else {**module_assigns, **_local_assigns(scope)}
+        for node in ast.walk(scope):
+            if not (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "text" and node.args):
+                continue
+            key = (node.lineno, node.col_offset)
+            sql = _resolve_sql(node.args[0], assigns)
+            # o escopo mais interno (última visita) ganha: lá as variáveis locais são conhecidas
+            if key in found and sql is None:
+                continue
+
+            if sql is None:
+                found[key] = (node.lineno, None, "argumento não literal")
+            elif _HOLE not in sql:
+                found[key] = (node.lineno, sql, None)
+            else:
+                m = _UPDATE_WHERE_RE.match(sql)
+                where_sql = _RETURNING_RE.sub("", m.group(2)) if m else None
+                if where_sql and _HOLE not in where_sql:
+                    found[key] = (node.lineno, f"SELECT 1 FROM {m.group(1)} WHERE{where_sql}", "template do WHERE")
+                else:
+                    found[key] = (node.lineno, None, "SQL dinâmico (f-string)")
+
+    return sorted(found.values(), key=lambda x: x[0])
+
+
+def sample_params(conn) -> dict:
+    """Valores reais do banco semeado (ou dummies se vazio) para os binds das queries."""
+    params = {
+        "uuid": _DUMMY_UUID,
+        "u": _DUMMY_UUID,
+        "sid": _DUMMY_UUID,
+        "eid": 1,
+        "lid": 1,
+        "id": 1,
+        "seq": 0,
+        "limite": 1,
+        "ve": 1,
+        "versao_esperada": 1,
+        "cil": "",
+        "codigo_obra": "",
+        "data_ensaio": "",
+        "estaca_num": "",
+        "h": "{}",
+        "k": "",
+    }
+
+    row = conn.execute(
+        text(
+            """
+            SELECT e.id, e.uuid, e.estaca_num, c.codigo_obra, c.data_ensaio
+            FROM estacas e
+            JOIN clientes c ON c.id = e.cliente_id
+            LIMIT 1
+            """
+        )
+    ).mappings().first()
+    if row:
+        params.update(
+            uuid=str(row["uuid"]),
+            u=str(row["uuid"]),
+            eid=int(row["id"]),
+            estaca_num=row["estaca_num"] or "",
+            codigo_obra=row["codigo_obra"] or "",
+            data_ensaio=row["data_ensaio"] or "",
+        )
+
+    cal = conn.execute(text("SELECT cilindro FROM calibracoes LIMIT 1")).scalar()
+    if cal is not None:
+        params["cil"] = cal
+
+    # binds de lista (= ANY(:ids) etc.) precisam de array, não de escalar
+    params.update(ids=[params["eid"]], uuids=[params["uuid"]], cils=[params["cil"]])
+
+    return params
+
+
+def _seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []) or []:
+        found.extend(_seq_scans(child))
+    return found
+
+
+def check(sources=None) -> int:
+    sources = [Path(s) for s in (sources or DEFAULT_SOURCES)]
+    engine = db_module.init_engine()
+    failures = 0
+
+    with engine.connect() as conn:
+        base_params = sample_params(conn)
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for src in sources:
+            for lineno, sql, obs in extract_queries(src):
+                where = f"{src.name}:{lineno}"
+                if sql is None:
+                    print(f"SKIP {where}: {obs}")
+                    continue
+                if obs:
+                    where += f" ({obs})"
+                if not _DML_RE.match(sql):
+                    print(f"SKIP {where}: não é DML")
+                    continue
+
+                names = set(_PARAM_RE.findall(sql))
+                params = {n: base_params.get(n, 1 if n.endswith("id") else "") for n in names}
+
+                conn.execute(text("SAVEPOINT explain_check"))
+                try:
+                    plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+                except Exception as e:
+                    conn.execute(text("ROLLBACK TO SAVEPOINT explain_check"))
+                    print(f"FAIL {where}: EXPLAIN falhou: {e}")
+                    failures += 1
+                    continue
+                conn.execute(text("RELEASE SAVEPOINT explain_check"))
+
+                scans = _seq_scans(plan[0]["Plan"])
+                if scans and _WHERE_RE.search(sql):
+                    print(f"FAIL {where}: Seq Scan em {', '.join(sorted(set(map(str, scans))))}")
+                    failures += 1
+                elif scans:
+                    print(f"ok   {where}: Seq Scan sem filtro (listagem)")
+                else:
+                    print(f"ok   {where}")
+
+        conn.rollback()
+
+    print(f"{failures} query(s) com problema" if failures else "todas as queries usam índice")
+    return 1 if failures else 0
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    return check(argv or None)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+"""
+Logging estruturado e barato para os caminhos quentes.
+
+- Os workers só enfileiram o LogRecord (QueueHandler, sem formatar nem fazer
+  I/O); uma thread (QueueListener) formata em JSON e escreve no stdout.
+- Fila cheia descarta (e conta) em vez de bloquear o request.
+- Erros repetidos (mesmo logger + mensagem + rota + tipo de exceção) passam em rajada
+  de LOG_ERROR_BURST por janela de LOG_ERROR_WINDOW s; depois disso só 1 a cada
+  LOG_ERROR_SAMPLE, com a contagem do que foi suprimido.
+- request_id (header X-Request-ID ou gerado) vai em cada log, na resposta e,
+  com SQL_REQUEST_ID_COMMENTS=1, como comentário em cada SQL (/* request_id=... */).
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from uuid import uuid4
+
+from app.config import get_env, get_int_env
+
+logger = logging.getLogger("pce_api")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# só caracteres seguros: o id vai dentro de comentário SQL
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        rid = getattr(record, "request_id", None)
+        if rid:
+            doc["request_id"] = rid
+        path = getattr(record, "path", None)
+        if path:
+            doc["path"] = path
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            doc["suppressed"] = suppressed
+        if record.exc_info:
+            doc["exc"] = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Rajada + amostragem por chave para WARNING/ERROR repetidos."""
+
+    def __init__(self, burst: int, window: float, sample_every: int):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_every = max(1, sample_every)
+        self._lock = threading.Lock()
+        self._state = {}  # chave -> [início da janela, vistos, suprimidos]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        # rota (template, ex. /ensaios/{uuid}) e não o path concreto: o mesmo erro em
+        # uuids diferentes é uma chave só
+        key = (record.name, record.msg, getattr(record, "route", None), exc_type)
+        now = time.monotonic()
+
+        with self._lock:
+            st = self._state.get(key)
+            if st is None or now - st[0] >= self.window:
+                suppressed = st[2] if st else 0
+                self._state[key] = [now, 1, 0]
+                if len(self._state) > 10000:
+                    self._state.clear()
+                record.suppressed = suppressed
+                return True
+
+            st[1] += 1
+            if st[1] <= self.burst or (st[1] - self.burst) % self.sample_every == 0:
+                record.suppressed = st[2]
+                st[2] = 0
+                return True
+
+            st[2] += 1
+            return False
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # não formata aqui (a thread do listener formata); só fixa o request_id
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+def setup_logging() -> None:
+    """Liga a fila + listener (idempotente). Chamado no startup do app."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    q = queue.Queue(maxsize=get_int_env("LOG_QUEUE_SIZE", 10000))
+
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(JsonFormatter())
+
+    _queue_handler = _NonBlockingQueueHandler(q)
+    _queue_handler.addFilter(
+        RateLimitFilter(
+            burst=get_int_env("LOG_ERROR_BURST", 5),
+            window=float(get_int_env("LOG_ERROR_WINDOW", 60)),
+            sample_every=get_int_env("LOG_ERROR_SAMPLE", 100),
+        )
+    )
+
+    root = logging.getLogger()
+    root.setLevel(get_env("LOG_LEVEL", "INFO").upper())
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_queue_handler)
+
+    # uvicorn tem handlers próprios (síncronos); manda tudo pela fila
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        lg = logging.getLogger(name)
+        lg.handlers = []
+        lg.propagate = True
+
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Esvazia a fila e para o listener (shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _NonBlockingQueueHandler.dropped:
+        print(
+            json.dumps({"level": "WARNING", "msg": "logs descartados (fila cheia)", "dropped": _NonBlockingQueueHandler.dropped}),
+            flush=True,
+        )
+
+
+def sql_comment_request_id(conn, cursor, statement, parameters, context, executemany):
+    """before_cursor_execute(retval=True): prefixa o SQL com o request_id corrente."""
+    rid = request_id_var.get()
+    if rid:
+        statement = f"/* request_id={rid} */ {statement}"
+    return statement, parameters
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI puro: define o request_id do request, devolve em
+    X-Request-ID e transforma exceção não tratada em 500 JSON (um log só, com
+    rate limit), sem str(e) na resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for k, v in scope.get("headers", ()):
+            if k == b"x-request-id":
+                cand = v.decode("latin-1")
+                if _REQUEST_ID_RE.match(cand):
+                    rid = cand
+                break
+        rid = rid or uuid4().hex
+        token = request_id_var.set(rid)
+        rid_header = (b"x-request-id", rid.encode("latin-1"))
+
+        started = False
+
+        async def send_with_id(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                message["headers"] = list(message.get("headers", [])) + [rid_header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        except Exception:
+            # scope["route"] é preenchido pelo roteador do FastAPI ao casar a rota
+            route = getattr(scope.get("route"), "path", None) or scope.get("path")
+            logger.exception(
+                "erro não tratado em %s %s",
+                scope.get("method"),
+                route,
+                extra={"route": route, "path": scope.get("path")},
+            )
+            if started:
+                raise
+            body = json.dumps({"detail": "Erro interno", "request_id": rid}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    rid_header,
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            request_id_var.reset(token)
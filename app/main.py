@@ -1,27 +1,68 @@
-from app import config  # noqa: F401
 from app.schemas import LeiturasBatchRequest, LeiturasBatchResponse  # adicione no topo também
 
-import traceback
-import re
+import json
+from contextlib import asynccontextmanager
+from typing import Optional
 from uuid import UUID, uuid4
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy import text
+from sqlalchemy.orm import Session
 
-from app.db import SessionLocal
+from app import db as db_module
+from app.config import get_int_env
+from app.db import get_db
+from app.logs import RequestContextMiddleware, logger, setup_logging, stop_logging
 from app.schemas import (
     PushPayload,
     CalibracaoIn,
     DuplicarEnsaioRequest,
     DuplicarEnsaioResponse,
+    EnsaiosBatchGetRequest,
+    LeituraIn,
+    PushSessionOpen,
+    PushSessionResponse,
+    LeiturasChunk,
+    PushChunkResponse,
+    PushSessionCommit,
 )
 
-app = FastAPI(title="PCE Sync API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # engine + warmup só no startup (import do módulo fica barato)
+    setup_logging()
+    db_module.init_engine()
+    try:
+        n = get_int_env("DB_WARMUP_CONNECTIONS", 2)
+        opened = db_module.warmup(n, _WARMUP_STATEMENTS)
+        logger.info("startup: warmup %s conexões", opened)
+    except Exception as e:
+        # banco fora no boot não impede subir; /health?ready=1 acusa
+        logger.warning("warmup falhou: %r", e)
+    yield
+    db_module.dispose_engine()
+    stop_logging()
+
+
+app = FastAPI(title="PCE Sync API", lifespan=lifespan)
+app.add_middleware(RequestContextMiddleware)
 
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+def health(ready: bool = False):
+    # liveness por padrão; ?ready=1 também checa o banco (SELECT 1 no pool)
+    if not ready:
+        return {"status": "ok"}
+    try:
+        db_module.ping()
+    except Exception as e:
+        # detalhe só no log; a resposta é pública
+        logger.warning("readiness: banco indisponível: %r", e)
+        raise HTTPException(status_code=503, detail={"status": "unavailable", "db": "unavailable"})
+    return {"status": "ok", "db": "ok"}
 
 
 # ==========================
@@ -30,243 +71,569 @@ def health():
 
 
 
+# ---------- concorrência otimista (coluna versao) ----------
+# A checagem vai no próprio UPDATE (WHERE ... AND versao = :versao_esperada);
+# só no caminho de conflito é feita uma leitura extra para devolver a versão atual.
+
+def _version_conflict(db, table: str, where_sql: str, params: dict, **info):
+    row = db.execute(
+        text(f"SELECT versao FROM {table} WHERE {where_sql} LIMIT 1"),
+        params,
+    ).mappings().first()
+    if not row:
+        return None
+    return HTTPException(
+        status_code=409,
+        detail={"reason": "version_conflict", **info, "versao_atual": int(row["versao"])},
+    )
+
+
+def _bump_estaca_versao(db, ensaio_uuid: str, versao_esperada: Optional[int]):
+    """Incrementa a versão da estaca (checando a esperada). Retorna (estaca_id, nova versao)."""
+    sql = "UPDATE estacas SET versao = versao + 1 WHERE uuid = :u"
+    params = {"u": ensaio_uuid}
+    if versao_esperada is not None:
+        sql += " AND versao = :ve"
+        params["ve"] = int(versao_esperada)
+    row = db.execute(text(sql + " RETURNING id, versao"), params).mappings().first()
+
+    if not row:
+        conflict = _version_conflict(db, "estacas", "uuid = :u", {"u": ensaio_uuid}, ensaio_uuid=ensaio_uuid)
+        if conflict:
+            raise conflict
+        raise HTTPException(status_code=404, detail="Ensaio não encontrado")
+
+    return int(row["id"]), int(row["versao"])
+
+
+# ---------- resumo do ensaio (tabela ensaio_resumo) ----------
+# Recalculado por estaca dentro da mesma transação de quem escreve leituras
+# (push, /leituras/batch, duplicar). Listagens e dashboards não leem leituras.
+
+SQL_REFRESH_RESUMO = text(
+    """
+    INSERT INTO ensaio_resumo (
+        estaca_id, n_leituras, carga_max_tf, total_media_final,
+        ultimo_estagio, ultimo_estabilizado, estabilizado, atualizado_em
+    )
+    SELECT
+        :eid,
+        agg.n_leituras,
+        agg.carga_max_tf,
+        ult.total_media,
+        ult.estagio,
+        ult.estabilizado,
+        COALESCE(upper(left(trim(ult.estabilizado), 1)) = 'S', false),
+        now()
+    FROM (
+        SELECT count(*) AS n_leituras, max(carga_tf) AS carga_max_tf
+        FROM leituras
+        WHERE estaca_id = :eid
+    ) agg
+    LEFT JOIN LATERAL (
+        SELECT total_media, estagio, estabilizado
+        FROM leituras
+        WHERE estaca_id = :eid
+        ORDER BY estagio DESC, row_ord DESC
+        LIMIT 1
+    ) ult ON true
+    ON CONFLICT (estaca_id) DO UPDATE SET
+        n_leituras          = EXCLUDED.n_leituras,
+        carga_max_tf        = EXCLUDED.carga_max_tf,
+        total_media_final   = EXCLUDED.total_media_final,
+        ultimo_estagio      = EXCLUDED.ultimo_estagio,
+        ultimo_estabilizado = EXCLUDED.ultimo_estabilizado,
+        estabilizado        = EXCLUDED.estabilizado,
+        atualizado_em       = EXCLUDED.atualizado_em
+    """
+)
+
+# patches de leitura que não mexem nestas colunas não precisam recalcular o resumo
+RESUMO_LEITURA_COLS = {"carga_tf", "total_media", "estabilizado"}
+
+
+def _refresh_ensaio_resumo(db, estaca_id: int) -> None:
+    db.execute(SQL_REFRESH_RESUMO, {"eid": int(estaca_id)})
+
+
 @app.post("/leituras/batch", response_model=LeiturasBatchResponse)
-def leituras_batch(req: LeiturasBatchRequest):
-    db = SessionLocal()
-    try:
-        ensaio_uuid = str(req.ensaio_uuid)
+def leituras_batch(req: LeiturasBatchRequest, db: Session = Depends(get_db)):
+    ensaio_uuid = str(req.ensaio_uuid)
+
+    items = [(item, item.patch.model_dump(exclude_none=True)) for item in req.items]
+    items = [(item, patch) for item, patch in items if patch]
 
-        # 1) acha estaca_id do ensaio
-        est = db.execute(
-            text("SELECT id FROM estacas WHERE uuid = :u LIMIT 1"),
+    if not items:
+        row = db.execute(
+            text("SELECT versao FROM estacas WHERE uuid = :u LIMIT 1"),
             {"u": ensaio_uuid},
         ).mappings().first()
-        if not est:
+        if not row:
             raise HTTPException(status_code=404, detail="Ensaio não encontrado")
+        # nada a gravar, mas versão desatualizada continua sendo conflito
+        if req.versao_esperada is not None and int(row["versao"]) != int(req.versao_esperada):
+            raise HTTPException(
+                status_code=409,
+                detail={"reason": "version_conflict", "ensaio_uuid": ensaio_uuid, "versao_atual": int(row["versao"])},
+            )
+        return LeiturasBatchResponse(ok=True, updated=0, versao=int(row["versao"]))
 
-        estaca_id = int(est["id"])
+    # 1) acha estaca_id do ensaio e já reserva a nova versão (trava a linha até o commit)
+    estaca_id, versao = _bump_estaca_versao(db, ensaio_uuid, req.versao_esperada)
 
-        updated = 0
+    updated = 0
+    leituras_versao = {}
+    resumo_afetado = False
 
-        # 2) aplica patches por leitura_id (somente se pertencer à estaca)
-        for item in req.items:
-            leitura_id = int(item.leitura_id)
-            patch = item.patch.model_dump(exclude_none=True)
+    # 2) aplica patches por leitura_id (somente se pertencer à estaca)
+    for item, patch in items:
+        leitura_id = int(item.leitura_id)
 
-            if not patch:
-                continue
+        set_clause = ", ".join([f"{k} = :{k}" for k in patch.keys()])
+        sql = f"UPDATE leituras SET {set_clause}, versao = versao + 1 WHERE id = :id AND estaca_id = :eid"
+        patch["id"] = leitura_id
+        patch["eid"] = estaca_id
+        if item.versao_esperada is not None:
+            sql += " AND versao = :versao_esperada"
+            patch["versao_esperada"] = int(item.versao_esperada)
 
-            # garante que a leitura pertence ao ensaio
-            ok_row = db.execute(
-                text("SELECT id FROM leituras WHERE id = :lid AND estaca_id = :eid LIMIT 1"),
-                {"lid": leitura_id, "eid": estaca_id},
-            ).mappings().first()
-            if not ok_row:
-                continue
+        row = db.execute(text(sql + " RETURNING versao"), patch).mappings().first()
+        if not row:
+            # sem versão esperada, leitura de outro ensaio é ignorada (como antes);
+            # com versão esperada: 409 se a versão divergiu ou se a leitura sumiu
+            if item.versao_esperada is not None:
+                conflict = _version_conflict(
+                    db, "leituras", "id = :lid AND estaca_id = :eid",
+                    {"lid": leitura_id, "eid": estaca_id},
+                    leitura_id=leitura_id,
+                )
+                raise conflict or HTTPException(
+                    status_code=409,
+                    detail={"reason": "leitura_removida", "leitura_id": leitura_id},
+                )
+            continue
 
-            set_clause = ", ".join([f"{k} = :{k}" for k in patch.keys()])
-            patch["id"] = leitura_id
-            db.execute(text(f"UPDATE leituras SET {set_clause} WHERE id = :id"), patch)
-            updated += 1
+        leituras_versao[leitura_id] = int(row["versao"])
+        updated += 1
+        resumo_afetado = resumo_afetado or not RESUMO_LEITURA_COLS.isdisjoint(patch)
 
-        db.commit()
-        return LeiturasBatchResponse(ok=True, updated=updated)
+    if resumo_afetado:
+        _refresh_ensaio_resumo(db, estaca_id)
+
+    db.commit()
+    return LeiturasBatchResponse(ok=True, updated=updated, versao=versao, leituras_versao=leituras_versao)
 
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        print("ERROR /leituras/batch:", repr(e), flush=True)
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 
 
 
 
 @app.get("/ensaios")
-def list_ensaios():
-    db = SessionLocal()
-    try:
-        rows = db.execute(
-            text(
-                """
-                SELECT
-                    e.uuid            AS uuid,
-                    e.uuid_origem     AS uuid_origem,
-                    e.origem          AS origem,
+def list_ensaios(db: Session = Depends(get_db)):
+    rows = db.execute(
+        text(
+            """
+            SELECT
+                e.uuid            AS uuid,
+                e.uuid_origem     AS uuid_origem,
+                e.origem          AS origem,
+
+                c.data_ensaio     AS data_ensaio,
+                c.codigo_obra     AS codigo_obra,
+
+                e.estaca_num      AS estaca,
+                e.carregamento    AS tipo_carregamento,
+                e.carga_ensaio_tf AS carga_ensaio_tf,
+                e.carga_adm_tf    AS carga_adm_tf,
+                e.versao          AS versao,
+
+                COALESCE(r.n_leituras, 0) AS n_leituras,
+                r.carga_max_tf            AS carga_max_tf,
+                r.total_media_final       AS total_media_final,
+                r.ultimo_estagio          AS ultimo_estagio,
+                r.estabilizado            AS estabilizado
+            FROM estacas e
+            JOIN clientes c ON c.id = e.cliente_id
+            LEFT JOIN ensaio_resumo r ON r.estaca_id = e.id
+            ORDER BY
+                c.data_ensaio DESC NULLS LAST,
+                c.codigo_obra ASC,
+                e.estaca_num ASC
+            """
+        )
+    ).mappings().all()
+    return {"ensaios": list(rows)}
+
+
+# colunas do ensaio (estaca + cliente): GET /ensaios/{uuid} e /ensaios/batch-get
+ESTACA_SELECT_SQL = """
+    SELECT
+        e.id              AS estaca_id,
+        e.uuid            AS uuid,
+        e.uuid_origem     AS uuid_origem,
+        e.origem          AS origem,
+
+        e.carregamento    AS carregamento,
+        e.estaca_num      AS estaca_num,
+        e.tipo_estaca     AS tipo_estaca,
+        e.diametro_cm     AS diametro_cm,
+        e.profundidade_m  AS profundidade_m,
+        e.carga_adm_tf    AS carga_adm_tf,
+        e.carga_ensaio_tf AS carga_ensaio_tf,
+        e.versao          AS versao,
+
+        c.codigo_obra     AS codigo_obra,
+        c.data_ensaio     AS data_ensaio,
+        c.cliente_nome    AS cliente_nome,
+        c.resp_obra       AS resp_obra,
+        c.tec_cedro       AS tec_cedro,
+        c.endereco        AS endereco,
+        c.cidade          AS cidade,
+        c.sondagem        AS sondagem
+    FROM estacas e
+    JOIN clientes c ON c.id = e.cliente_id
+"""
+
+# queries do GET /ensaios/{uuid} (também usadas no warmup do startup)
+SQL_ESTACA_BY_UUID = text(ESTACA_SELECT_SQL + "    WHERE e.uuid = :uuid\n")
+
+# /ensaios/batch-get
+SQL_ESTACAS_BY_UUIDS = text(ESTACA_SELECT_SQL + "    WHERE e.uuid = ANY(CAST(:uuids AS uuid[]))\n")
+SQL_ESTACAS_BY_OBRA = text(
+    ESTACA_SELECT_SQL
+    + """
+    WHERE c.codigo_obra = :codigo_obra
+    ORDER BY
+        c.data_ensaio DESC NULLS LAST,
+        e.estaca_num ASC
+    LIMIT :limite
+    """
+)
 
-                    c.data_ensaio     AS data_ensaio,
-                    c.codigo_obra     AS codigo_obra,
+SQL_EQUIPAMENTO_ATUAL = text(
+    """
+    SELECT
+        leitura,
+        cilindro_serie, cilindro_area_cm2,
+        celula_serie,
+        lvdt_serie01, lvdt_serie02, lvdt_serie03, lvdt_serie04
+    FROM equipamentos
+    WHERE estaca_id = :eid
+    ORDER BY id DESC
+    LIMIT 1
+    """
+)
 
-                    e.estaca_num      AS estaca,
-                    e.carregamento    AS tipo_carregamento,
-                    e.carga_ensaio_tf AS carga_ensaio_tf,
-                    e.carga_adm_tf    AS carga_adm_tf
-                FROM estacas e
-                JOIN clientes c ON c.id = e.cliente_id
-                ORDER BY
-                    c.data_ensaio DESC NULLS LAST,
-                    c.codigo_obra ASC,
-                    e.estaca_num ASC
-                """
-            )
-        ).mappings().all()
-        return {"ensaios": list(rows)}
-    except Exception as e:
-        print("ERROR /ensaios:", repr(e), flush=True)
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+SQL_CALIBRACAO_ATUAL = text(
+    """
+    SELECT area_cm2, carga_maxima_tf
+    FROM calibracoes
+    WHERE cilindro = :cil
+    ORDER BY id DESC
+    LIMIT 1
+    """
+)
+
+SQL_LEITURAS_ESTACA = text(
+    """
+    SELECT
+        id,
+        estagio, row_ord,
+        carga_tf, pressao_kgf_cm2,
+        horario, tempo_estagio, tempo_estagio_min, tempo_total,
+        leitura_01, leitura_02, leitura_03, leitura_04,
+        parcial_01, parcial_02, parcial_03, parcial_04,
+        total_01, total_02, total_03, total_04,
+        total_media, estabilizado, porcentagem,
+        grafico, observacao,
+        obrigatoria, is_referencia,
+        ref_override_01, ref_override_02, ref_override_03, ref_override_04,
+        versao
+    FROM leituras
+    WHERE estaca_id = :eid
+    ORDER BY estagio ASC, row_ord ASC
+    """
+)
+
+# parâmetros que não casam com nada: só preparam o statement em cada conexão
+_WARMUP_STATEMENTS = [
+    (SQL_ESTACA_BY_UUID, {"uuid": "00000000-0000-0000-0000-000000000000"}),
+    (SQL_EQUIPAMENTO_ATUAL, {"eid": -1}),
+    (SQL_CALIBRACAO_ATUAL, {"cil": ""}),
+    (SQL_LEITURAS_ESTACA, {"eid": -1}),
+]
+
+
+def _ensaio_document(estaca_row, equipamento_row, cal_row, leituras_rows) -> dict:
+    """Monta o documento do ensaio (mesmo formato de GET /ensaios/{uuid})."""
+    cliente = {
+        "codigo_obra": estaca_row["codigo_obra"],
+        "data_ensaio": estaca_row["data_ensaio"],
+        "cliente_nome": estaca_row["cliente_nome"],
+        "resp_obra": estaca_row["resp_obra"],
+        "tec_cedro": estaca_row["tec_cedro"],
+        "endereco": estaca_row["endereco"],
+        "cidade": estaca_row["cidade"],
+        "sondagem": estaca_row["sondagem"],
+    }
+
+    estaca = {
+        "estaca_id": estaca_row["estaca_id"],
+        "uuid": estaca_row["uuid"],
+        "uuid_origem": estaca_row["uuid_origem"],
+        "origem": estaca_row["origem"],
+        "carregamento": estaca_row["carregamento"],
+        "estaca_num": estaca_row["estaca_num"],
+        "tipo_estaca": estaca_row["tipo_estaca"],
+        "diametro_cm": estaca_row["diametro_cm"],
+        "profundidade_m": estaca_row["profundidade_m"],
+        "carga_adm_tf": estaca_row["carga_adm_tf"],
+        "carga_ensaio_tf": estaca_row["carga_ensaio_tf"],
+        "versao": estaca_row["versao"],
+    }
+
+    equip = dict(equipamento_row) if equipamento_row else None
+    if equip is not None and cal_row:
+        # ✅ se area não veio no equipamento, usa calibracao
+        if (equip.get("cilindro_area_cm2") is None or str(equip.get("cilindro_area_cm2")) == "") and cal_row.get("area_cm2") is not None:
+            equip["cilindro_area_cm2"] = cal_row.get("area_cm2")
+
+        # ✅ SEMPRE devolve carga_maxima_tf para o novo_page
+        equip["carga_maxima_tf"] = cal_row.get("carga_maxima_tf")
+
+    return {
+        "cliente": cliente,
+        "estaca": estaca,
+        "equipamento": equip,
+        "leituras": list(leituras_rows),
+    }
 
 
 @app.get("/ensaios/{uuid}")
-def get_ensaio(uuid: UUID):
-    db = SessionLocal()
-    try:
-        estaca_row = db.execute(
-            text(
-                """
-                SELECT
-                    e.id              AS estaca_id,
-                    e.uuid            AS uuid,
-                    e.uuid_origem     AS uuid_origem,
-                    e.origem          AS origem,
-
-                    e.carregamento    AS carregamento,
-                    e.estaca_num      AS estaca_num,
-                    e.tipo_estaca     AS tipo_estaca,
-                    e.diametro_cm     AS diametro_cm,
-                    e.profundidade_m  AS profundidade_m,
-                    e.carga_adm_tf    AS carga_adm_tf,
-                    e.carga_ensaio_tf AS carga_ensaio_tf,
-
-                    c.codigo_obra     AS codigo_obra,
-                    c.data_ensaio     AS data_ensaio,
-                    c.cliente_nome    AS cliente_nome,
-                    c.resp_obra       AS resp_obra,
-                    c.tec_cedro       AS tec_cedro,
-                    c.endereco        AS endereco,
-                    c.cidade          AS cidade,
-                    c.sondagem        AS sondagem
-                FROM estacas e
-                JOIN clientes c ON c.id = e.cliente_id
-                WHERE e.uuid = :uuid
-                """
-            ),
-            {"uuid": str(uuid)},
-        ).mappings().first()
+def get_ensaio(uuid: UUID, db: Session = Depends(get_db)):
+    estaca_row = db.execute(
+        SQL_ESTACA_BY_UUID,
+        {"uuid": str(uuid)},
+    ).mappings().first()
 
-        if not estaca_row:
-            raise HTTPException(status_code=404, detail="Ensaio não encontrado")
+    if not estaca_row:
+        raise HTTPException(status_code=404, detail="Ensaio não encontrado")
+
+    estaca_id = estaca_row["estaca_id"]
+
+    equipamento_row = db.execute(
+        SQL_EQUIPAMENTO_ATUAL,
+        {"eid": estaca_id},
+    ).mappings().first()
 
-        estaca_id = estaca_row["estaca_id"]
+    # ✅ Recupera calibracao por cilindro_serie (para area e carga_maxima_tf)
+    cal_row = None
+    if equipamento_row and equipamento_row.get("cilindro_serie"):
+        try:
+            cal_row = db.execute(
+                SQL_CALIBRACAO_ATUAL,
+                {"cil": equipamento_row["cilindro_serie"]},
+            ).mappings().first()
+        except Exception:
+            cal_row = None
+
+    leituras_rows = db.execute(
+        SQL_LEITURAS_ESTACA,
+        {"eid": estaca_id},
+    ).mappings().all()
+
+    return _ensaio_document(estaca_row, equipamento_row, cal_row, leituras_rows)
+
+
+# =====================================================
+# ENSAIOS EM LOTE (ESCRITÓRIO) - uma query por tabela, sem N+1
+# =====================================================
 
-        equipamento_row = db.execute(
+BATCH_GET_MAX = 500
+
+
+@app.post("/ensaios/batch-get")
+def batch_get_ensaios(payload: EnsaiosBatchGetRequest, db: Session = Depends(get_db)):
+    if bool(payload.uuids) == bool(payload.codigo_obra):
+        raise HTTPException(status_code=400, detail="Informe uuids ou codigo_obra")
+    if payload.uuids and len(payload.uuids) > BATCH_GET_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BATCH_GET_MAX} uuids por chamada")
+
+    if payload.uuids:
+        uuids = list(dict.fromkeys(str(u) for u in payload.uuids))
+        estaca_rows = db.execute(SQL_ESTACAS_BY_UUIDS, {"uuids": uuids}).mappings().all()
+        # mantém a ordem pedida
+        pos = {u: i for i, u in enumerate(uuids)}
+        estaca_rows = sorted(estaca_rows, key=lambda r: pos.get(str(r["uuid"]), len(pos)))
+    else:
+        # uma linha além do máximo basta para recusar a obra sem carregar todas
+        estaca_rows = db.execute(
+            SQL_ESTACAS_BY_OBRA,
+            {"codigo_obra": payload.codigo_obra, "limite": BATCH_GET_MAX + 1},
+        ).mappings().all()
+
+    if len(estaca_rows) > BATCH_GET_MAX:
+        raise HTTPException(status_code=400, detail=f"Obra com mais de {BATCH_GET_MAX} ensaios")
+
+    ids = [int(r["estaca_id"]) for r in estaca_rows]
+
+    # equipamento mais recente de cada estaca
+    equip_por_estaca = {}
+    cilindros = set()
+    if ids:
+        for r in db.execute(
             text(
                 """
-                SELECT
+                SELECT DISTINCT ON (estaca_id)
+                    estaca_id,
                     leitura,
                     cilindro_serie, cilindro_area_cm2,
                     celula_serie,
                     lvdt_serie01, lvdt_serie02, lvdt_serie03, lvdt_serie04
                 FROM equipamentos
-                WHERE estaca_id = :eid
-                ORDER BY id DESC
-                LIMIT 1
+                WHERE estaca_id = ANY(:ids)
+                ORDER BY estaca_id, id DESC
                 """
             ),
-            {"eid": estaca_id},
-        ).mappings().first()
-
-        # ✅ Recupera calibracao por cilindro_serie (para area e carga_maxima_tf)
-        cal_row = None
-        if equipamento_row and equipamento_row.get("cilindro_serie"):
-            try:
-                cal_row = db.execute(
-                    text(
-                        """
-                        SELECT area_cm2, carga_maxima_tf
-                        FROM calibracoes
-                        WHERE cilindro = :cil
-                        ORDER BY id DESC
-                        LIMIT 1
-                        """
-                    ),
-                    {"cil": equipamento_row["cilindro_serie"]},
-                ).mappings().first()
-            except Exception:
-                cal_row = None
-
-        leituras_rows = db.execute(
+            {"ids": ids},
+        ).mappings():
+            d = dict(r)
+            equip_por_estaca[d.pop("estaca_id")] = d
+            if d.get("cilindro_serie"):
+                cilindros.add(d["cilindro_serie"])
+
+    # calibração mais recente de cada cilindro
+    cal_por_cilindro = {}
+    if cilindros:
+        for r in db.execute(
             text(
                 """
-                SELECT
-                    id,
-                    estagio, row_ord,
-                    carga_tf, pressao_kgf_cm2,
-                    horario, tempo_estagio, tempo_estagio_min, tempo_total,
-                    leitura_01, leitura_02, leitura_03, leitura_04,
-                    parcial_01, parcial_02, parcial_03, parcial_04,
-                    total_01, total_02, total_03, total_04,
-                    total_media, estabilizado, porcentagem,
-                    grafico, observacao,
-                    obrigatoria, is_referencia,
-                    ref_override_01, ref_override_02, ref_override_03, ref_override_04
-                FROM leituras
-                WHERE estaca_id = :eid
-                ORDER BY estagio ASC, row_ord ASC
+                SELECT DISTINCT ON (cilindro)
+                    cilindro, area_cm2, carga_maxima_tf
+                FROM calibracoes
+                WHERE cilindro = ANY(:cils)
+                ORDER BY cilindro, id DESC
                 """
             ),
-            {"eid": estaca_id},
-        ).mappings().all()
+            {"cils": sorted(cilindros)},
+        ).mappings():
+            cal_por_cilindro[r["cilindro"]] = r
+
+    nao_encontrados = []
+    if payload.uuids:
+        achados = {str(r["uuid"]) for r in estaca_rows}
+        nao_encontrados = [u for u in uuids if u not in achados]
+
+    # leituras de todas as estacas numa query, na ordem dos ensaios da resposta:
+    # cada documento fica completo assim que as leituras da próxima estaca aparecem
+    leituras_sql = text(
+        """
+        SELECT
+            o.estaca_id,
+            id,
+            estagio, row_ord,
+            carga_tf, pressao_kgf_cm2,
+            horario, tempo_estagio, tempo_estagio_min, tempo_total,
+            leitura_01, leitura_02, leitura_03, leitura_04,
+            parcial_01, parcial_02, parcial_03, parcial_04,
+            total_01, total_02, total_03, total_04,
+            total_media, estabilizado, porcentagem,
+            grafico, observacao,
+            obrigatoria, is_referencia,
+            ref_override_01, ref_override_02, ref_override_03, ref_override_04,
+            versao
+        FROM unnest(CAST(:ids AS integer[])) WITH ORDINALITY AS o(estaca_id, pos)
+        JOIN leituras l ON l.estaca_id = o.estaca_id
+        ORDER BY o.pos, estagio ASC, row_ord ASC
+        """
+    )
+
+    def docs(leituras_rows):
+        rows = iter(leituras_rows)
+        atual = next(rows, None)
+        for est in estaca_rows:
+            eid = int(est["estaca_id"])
+            leituras = []
+            while atual is not None and atual["estaca_id"] == eid:
+                d = dict(atual)
+                d.pop("estaca_id")
+                leituras.append(d)
+                atual = next(rows, None)
+            equip = equip_por_estaca.get(eid)
+            cal = cal_por_cilindro.get(equip.get("cilindro_serie")) if equip else None
+            yield _ensaio_document(est, equip, cal, leituras)
+
+    if payload.stream:
+        # NDJSON: cada ensaio é serializado e enviado assim que suas leituras
+        # chegam (cursor no servidor); a memória fica em ~1 documento por vez.
+        # Sessão própria: a do request pode ser fechada antes do corpo terminar.
+        def gen():
+            with db_module.SessionLocal() as s:
+                rows = (
+                    s.execute(leituras_sql, {"ids": ids}, execution_options={"yield_per": 500}).mappings()
+                    if ids
+                    else []
+                )
+                for doc in docs(rows):
+                    yield json.dumps(jsonable_encoder(doc), ensure_ascii=False) + "\n"
+            if nao_encontrados:
+                yield json.dumps({"nao_encontrados": nao_encontrados}) + "\n"
+
+        return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+    rows = db.execute(leituras_sql, {"ids": ids}).mappings() if ids else []
+    return {"ensaios": list(docs(rows)), "nao_encontrados": nao_encontrados}
+
+
+# =====================================================
+# RESUMO POR OBRA (DASHBOARD) - só ensaio_resumo, sem leituras
+# =====================================================
+
+# agregado por obra: /obras/resumo e /obras/{codigo_obra}/resumo
+OBRA_RESUMO_SELECT_SQL = """
+    SELECT
+        c.codigo_obra                              AS codigo_obra,
+        count(e.id)                                AS ensaios,
+        COALESCE(sum(r.n_leituras), 0)             AS leituras,
+        max(r.carga_max_tf)                        AS carga_max_tf,
+        max(e.carga_ensaio_tf)                     AS carga_ensaio_max_tf,
+        sum(CASE WHEN r.estabilizado THEN 1 ELSE 0 END) AS estabilizados,
+        min(c.data_ensaio)                         AS primeira_data_ensaio,
+        max(c.data_ensaio)                         AS ultima_data_ensaio
+    FROM clientes c
+    JOIN estacas e ON e.cliente_id = c.id
+    LEFT JOIN ensaio_resumo r ON r.estaca_id = e.id
+"""
+
+SQL_OBRAS_RESUMO = text(
+    OBRA_RESUMO_SELECT_SQL
+    + """
+    GROUP BY c.codigo_obra
+    ORDER BY max(c.data_ensaio) DESC NULLS LAST, c.codigo_obra ASC
+    """
+)
 
-        cliente = {
-            "codigo_obra": estaca_row["codigo_obra"],
-            "data_ensaio": estaca_row["data_ensaio"],
-            "cliente_nome": estaca_row["cliente_nome"],
-            "resp_obra": estaca_row["resp_obra"],
-            "tec_cedro": estaca_row["tec_cedro"],
-            "endereco": estaca_row["endereco"],
-            "cidade": estaca_row["cidade"],
-            "sondagem": estaca_row["sondagem"],
-        }
-
-        estaca = {
-            "estaca_id": estaca_row["estaca_id"],
-            "uuid": estaca_row["uuid"],
-            "uuid_origem": estaca_row["uuid_origem"],
-            "origem": estaca_row["origem"],
-            "carregamento": estaca_row["carregamento"],
-            "estaca_num": estaca_row["estaca_num"],
-            "tipo_estaca": estaca_row["tipo_estaca"],
-            "diametro_cm": estaca_row["diametro_cm"],
-            "profundidade_m": estaca_row["profundidade_m"],
-            "carga_adm_tf": estaca_row["carga_adm_tf"],
-            "carga_ensaio_tf": estaca_row["carga_ensaio_tf"],
-        }
-
-        equip = dict(equipamento_row) if equipamento_row else None
-        if equip is not None and cal_row:
-            # ✅ se area não veio no equipamento, usa calibracao
-            if (equip.get("cilindro_area_cm2") is None or str(equip.get("cilindro_area_cm2")) == "") and cal_row.get("area_cm2") is not None:
-                equip["cilindro_area_cm2"] = cal_row.get("area_cm2")
-
-            # ✅ SEMPRE devolve carga_maxima_tf para o novo_page
-            equip["carga_maxima_tf"] = cal_row.get("carga_maxima_tf")
-
-        return {
-            "cliente": cliente,
-            "estaca": estaca,
-            "equipamento": equip,
-            "leituras": list(leituras_rows),
-        }
-    finally:
-        db.close()
+SQL_OBRA_RESUMO = text(
+    OBRA_RESUMO_SELECT_SQL
+    + """
+    WHERE c.codigo_obra = :codigo_obra
+    GROUP BY c.codigo_obra
+    """
+)
+
+
+@app.get("/obras/resumo")
+def list_obras_resumo(db: Session = Depends(get_db)):
+    rows = db.execute(SQL_OBRAS_RESUMO).mappings().all()
+    return {"obras": list(rows)}
+
+
+@app.get("/obras/{codigo_obra}/resumo")
+def get_obra_resumo(codigo_obra: str, db: Session = Depends(get_db)):
+    row = db.execute(SQL_OBRA_RESUMO, {"codigo_obra": codigo_obra}).mappings().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Obra não encontrada")
+    return dict(row)
 
 
 # =====================================================
@@ -296,286 +663,651 @@ def _find_estaca_by_codigo_estaca(db, codigo_obra: str, estaca_num: str):
     ).mappings().first()
 
 
-def _push_impl(payload: PushPayload):
-    db = SessionLocal()
-    try:
-        overwrite = bool(getattr(payload, "overwrite", False))
+def _update_estaca_versionada(db, estaca_id: int, params: dict, versao_esperada, est_uuid: str) -> int:
+    """UPDATE da estaca + versao = versao + 1, checando a versão esperada. Retorna a nova versão."""
+    set_clause = ", ".join([f"{k} = :{k}" for k in params.keys()])
+    sql = f"UPDATE estacas SET {set_clause}, versao = versao + 1 WHERE id = :id"
+    params["id"] = estaca_id
+    if versao_esperada is not None:
+        sql += " AND versao = :versao_esperada"
+        params["versao_esperada"] = int(versao_esperada)
+
+    row = db.execute(text(sql + " RETURNING versao"), params).mappings().first()
+    if not row:
+        conflict = _version_conflict(db, "estacas", "id = :id", {"id": estaca_id}, ensaio_uuid=est_uuid)
+        raise conflict or HTTPException(status_code=404, detail="Ensaio não encontrado")
+    return int(row["versao"])
+
+
+def _exists_conflict(codigo_obra: str, estaca_num: str, row_exist) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={
+            "reason": "exists",
+            "by": "codigo_obra+estaca_num",
+            "codigo_obra": codigo_obra,
+            "estaca_num": estaca_num,
+            "existing_uuid": str(row_exist.get("uuid") or ""),
+        },
+    )
+
+
+def _check_ensaio_header(db, payload) -> None:
+    """
+    Mesmos 409 de _upsert_ensaio_header (versão divergente / estaca já existe),
+    só lendo. Usado na abertura da sessão de push para falhar antes do upload;
+    o commit checa de novo dentro da transação que grava.
+    """
+    est_uuid = str(payload.estaca.uuid)
+    row = db.execute(
+        text("SELECT versao FROM estacas WHERE uuid = :uuid LIMIT 1"),
+        {"uuid": est_uuid},
+    ).mappings().first()
 
-        # -------- Cliente --------
-        cli = payload.cliente.model_dump()
-        codigo_obra = (cli.get("codigo_obra") or "").strip()
-        data_ensaio = cli.get("data_ensaio")
+    if row:
+        versao_esperada = getattr(payload, "versao_esperada", None)
+        if versao_esperada is not None and int(row["versao"]) != int(versao_esperada):
+            raise HTTPException(
+                status_code=409,
+                detail={"reason": "version_conflict", "ensaio_uuid": est_uuid, "versao_atual": int(row["versao"])},
+            )
+        return
 
-        row_cli = db.execute(
-            text(
-                """
-                SELECT id
-                FROM clientes
-                WHERE codigo_obra = :codigo_obra AND data_ensaio = :data_ensaio
-                LIMIT 1
-                """
-            ),
-            {"codigo_obra": codigo_obra, "data_ensaio": data_ensaio},
-        ).mappings().first()
+    codigo_obra = (payload.cliente.codigo_obra or "").strip()
+    estaca_num = (payload.estaca.estaca_num or "").strip()
+    row_exist = _find_estaca_by_codigo_estaca(db, codigo_obra, estaca_num)
+    if row_exist and not getattr(payload, "overwrite", False):
+        raise _exists_conflict(codigo_obra, estaca_num, row_exist)
+
+
+def _upsert_ensaio_header(db, payload) -> tuple[int, str, int]:
+    """
+    Grava cliente, estaca e equipamento de um push (PushPayload ou PushSessionOpen).
+    Retorna (estaca_id, uuid da estaca, versão da estaca). Não faz commit.
+    """
+    overwrite = bool(getattr(payload, "overwrite", False))
+
+    # -------- Cliente --------
+    cli = payload.cliente.model_dump()
+    codigo_obra = (cli.get("codigo_obra") or "").strip()
+    data_ensaio = cli.get("data_ensaio")
+
+    row_cli = db.execute(
+        text(
+            """
+            SELECT id
+            FROM clientes
+            WHERE codigo_obra = :codigo_obra AND data_ensaio = :data_ensaio
+            LIMIT 1
+            """
+        ),
+        {"codigo_obra": codigo_obra, "data_ensaio": data_ensaio},
+    ).mappings().first()
+
+    if row_cli:
+        cliente_id = row_cli["id"]
+        set_clause = ", ".join([f"{k} = :{k}" for k in cli.keys()])
+        cli["id"] = cliente_id
+        db.execute(text(f"UPDATE clientes SET {set_clause} WHERE id = :id"), cli)
+    else:
+        cols = ", ".join(cli.keys())
+        vals = ", ".join([f":{k}" for k in cli.keys()])
+        cliente_id = db.execute(
+            text(f"INSERT INTO clientes ({cols}) VALUES ({vals}) RETURNING id"),
+            cli,
+        ).scalar_one()
+
+    # -------- Estaca --------
+    est = payload.estaca.model_dump()
+    est_uuid = str(est.get("uuid"))
+    estaca_num = (est.get("estaca_num") or "").strip()
+
+    row_est_by_uuid = db.execute(
+        text("SELECT id, origem, uuid_origem FROM estacas WHERE uuid = :uuid LIMIT 1"),
+        {"uuid": est_uuid},
+    ).mappings().first()
+
+    if row_est_by_uuid:
+        estaca_id = row_est_by_uuid["id"]
+        origem_atual = row_est_by_uuid.get("origem")
+        uuid_origem_atual = row_est_by_uuid.get("uuid_origem")
+
+        est["cliente_id"] = cliente_id
+        params = {k: v for k, v in est.items() if k != "uuid"}
+        versao = _update_estaca_versionada(
+            db, estaca_id, params, getattr(payload, "versao_esperada", None), est_uuid
+        )
+
+        if not origem_atual:
+            db.execute(text("UPDATE estacas SET origem = 'campo' WHERE id = :id"), {"id": estaca_id})
+        if not uuid_origem_atual:
+            db.execute(text("UPDATE estacas SET uuid_origem = uuid WHERE id = :id"), {"id": estaca_id})
+
+    else:
+        row_exist = _find_estaca_by_codigo_estaca(db, codigo_obra, estaca_num)
+
+        if row_exist:
+            if not overwrite:
+                raise _exists_conflict(codigo_obra, estaca_num, row_exist)
+
+            estaca_id = int(row_exist["id"])
+
+            est_update = {k: v for k, v in est.items() if k != "uuid"}
+            est_update["cliente_id"] = cliente_id
+            est_update["uuid"] = est_uuid
+            est_update["origem"] = "campo"
+            est_update["uuid_origem"] = est_uuid
+            est_update["revisao"] = None
+
+            versao = _update_estaca_versionada(db, estaca_id, est_update, None, est_uuid)
 
-        if row_cli:
-            cliente_id = row_cli["id"]
-            set_clause = ", ".join([f"{k} = :{k}" for k in cli.keys()])
-            cli["id"] = cliente_id
-            db.execute(text(f"UPDATE clientes SET {set_clause} WHERE id = :id"), cli)
         else:
-            cols = ", ".join(cli.keys())
-            vals = ", ".join([f":{k}" for k in cli.keys()])
-            cliente_id = db.execute(
-                text(f"INSERT INTO clientes ({cols}) VALUES ({vals}) RETURNING id"),
-                cli,
+            est["cliente_id"] = cliente_id
+            est["origem"] = "campo"
+            est["uuid_origem"] = est_uuid
+
+            cols = ", ".join(est.keys())
+            vals = ", ".join([f":{k}" for k in est.keys()])
+            estaca_id = db.execute(
+                text(f"INSERT INTO estacas ({cols}) VALUES ({vals}) RETURNING id"),
+                est,
             ).scalar_one()
+            versao = 0
 
-        # -------- Estaca --------
-        est = payload.estaca.model_dump()
-        est_uuid = str(est.get("uuid"))
-        estaca_num = (est.get("estaca_num") or "").strip()
+    # -------- Equipamentos --------
+    eq = payload.equipamento.model_dump() if payload.equipamento else {}
+    if eq:
+        eq["estaca_id"] = estaca_id
+        cols = ", ".join(eq.keys())
+        vals = ", ".join([f":{k}" for k in eq.keys()])
+        db.execute(text(f"INSERT INTO equipamentos ({cols}) VALUES ({vals})"), eq)
 
-        row_est_by_uuid = db.execute(
-            text("SELECT id, origem, uuid_origem FROM estacas WHERE uuid = :uuid LIMIT 1"),
-            {"uuid": est_uuid},
-        ).mappings().first()
+    return estaca_id, est_uuid, versao
 
-        if row_est_by_uuid:
-            estaca_id = row_est_by_uuid["id"]
-            origem_atual = row_est_by_uuid.get("origem")
-            uuid_origem_atual = row_est_by_uuid.get("uuid_origem")
 
-            est["cliente_id"] = cliente_id
-            params = {k: v for k, v in est.items() if k != "uuid"}
-            set_clause = ", ".join([f"{k} = :{k}" for k in params.keys()])
-            params["id"] = estaca_id
-            db.execute(text(f"UPDATE estacas SET {set_clause} WHERE id = :id"), params)
+def _push_impl(db, payload: PushPayload):
+    estaca_id, est_uuid, versao = _upsert_ensaio_header(db, payload)
 
-            if not origem_atual:
-                db.execute(text("UPDATE estacas SET origem = 'campo' WHERE id = :id"), {"id": estaca_id})
-            if not uuid_origem_atual:
-                db.execute(text("UPDATE estacas SET uuid_origem = uuid WHERE id = :id"), {"id": estaca_id})
+    # -------- Leituras (BULK INSERT) --------
+    db.execute(text("DELETE FROM leituras WHERE estaca_id = :eid"), {"eid": estaca_id})
 
-        else:
-            row_exist = _find_estaca_by_codigo_estaca(db, codigo_obra, estaca_num)
-
-            if row_exist:
-                if not overwrite:
-                    raise HTTPException(
-                        status_code=409,
-                        detail={
-                            "reason": "exists",
-                            "by": "codigo_obra+estaca_num",
-                            "codigo_obra": codigo_obra,
-                            "estaca_num": estaca_num,
-                            "existing_uuid": str(row_exist.get("uuid") or ""),
-                        },
-                    )
+    rows = []
+    for leitura in payload.leituras:
+        d = leitura.model_dump()
+        d["estaca_id"] = estaca_id
+        rows.append(d)
 
-                estaca_id = int(row_exist["id"])
-
-                est_update = {k: v for k, v in est.items() if k != "uuid"}
-                est_update["cliente_id"] = cliente_id
-                est_update["uuid"] = est_uuid
-                est_update["origem"] = "campo"
-                est_update["uuid_origem"] = est_uuid
-
-                set_clause = ", ".join([f"{k} = :{k}" for k in est_update.keys()])
-                est_update["id"] = estaca_id
-                db.execute(text(f"UPDATE estacas SET {set_clause} WHERE id = :id"), est_update)
-
-            else:
-                est["cliente_id"] = cliente_id
-                est["origem"] = "campo"
-                est["uuid_origem"] = est_uuid
-
-                cols = ", ".join(est.keys())
-                vals = ", ".join([f":{k}" for k in est.keys()])
-                estaca_id = db.execute(
-                    text(f"INSERT INTO estacas ({cols}) VALUES ({vals}) RETURNING id"),
-                    est,
-                ).scalar_one()
-
-        # -------- Equipamentos --------
-        eq = payload.equipamento.model_dump() if payload.equipamento else {}
-        if eq:
-            eq["estaca_id"] = estaca_id
-            cols = ", ".join(eq.keys())
-            vals = ", ".join([f":{k}" for k in eq.keys()])
-            db.execute(text(f"INSERT INTO equipamentos ({cols}) VALUES ({vals})"), eq)
-
-        # -------- Leituras (BULK INSERT) --------
-        db.execute(text("DELETE FROM leituras WHERE estaca_id = :eid"), {"eid": estaca_id})
-
-        rows = []
-        for leitura in payload.leituras:
-            d = leitura.model_dump()
-            d["estaca_id"] = estaca_id
-            rows.append(d)
-
-        if rows:
-            cols = list(rows[0].keys())
-            cols_sql = ", ".join(cols)
-            vals_sql = ", ".join([f":{c}" for c in cols])
-
-            insert_sql = text(f"INSERT INTO leituras ({cols_sql}) VALUES ({vals_sql})")
-            db.execute(insert_sql, rows)
-
-        db.commit()
-        return {"ok": True, "uuid": est_uuid}
-
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        print("ERROR push:", repr(e), flush=True)
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+    if rows:
+        cols = list(rows[0].keys())
+        cols_sql = ", ".join(cols)
+        vals_sql = ", ".join([f":{c}" for c in cols])
+
+        insert_sql = text(f"INSERT INTO leituras ({cols_sql}) VALUES ({vals_sql})")
+        db.execute(insert_sql, rows)
+
+    _refresh_ensaio_resumo(db, estaca_id)
+
+    db.commit()
+    return {"ok": True, "uuid": est_uuid, "versao": versao}
 
 
 @app.post("/push")
-def push(payload: PushPayload):
-    return _push_impl(payload)
+def push(payload: PushPayload, db: Session = Depends(get_db)):
+    return _push_impl(db, payload)
 
 
 @app.post("/upload")
-def upload(payload: PushPayload):
-    return _push_impl(payload)
+def upload(payload: PushPayload, db: Session = Depends(get_db)):
+    return _push_impl(db, payload)
 
 
 @app.post("/sync/push")
-def sync_push(payload: PushPayload):
-    return _push_impl(payload)
+def sync_push(payload: PushPayload, db: Session = Depends(get_db)):
+    return _push_impl(db, payload)
 
 
 @app.post("/sync/upload")
-def sync_upload(payload: PushPayload):
-    return _push_impl(payload)
+def sync_upload(payload: PushPayload, db: Session = Depends(get_db)):
+    return _push_impl(db, payload)
+
+
+# =====================================================
+# PUSH EM SESSÃO (CAMPO) - chunks + COPY em staging + commit atômico
+# =====================================================
+#
+# 1) POST /sync/push/sessions                     -> abre (ou retoma) a sessão da estaca
+# 2) PUT  /sync/push/sessions/{sid}/chunks/{seq}  -> cada chunk vai via COPY p/ leituras_staging
+# 3) POST /sync/push/sessions/{sid}/commit        -> grava cabeçalho e troca as leituras
+#
+# Se a conexão cair, GET /sync/push/sessions/{sid} (ou reabrir a sessão) devolve
+# next_chunk e o app continua dali. Chunks já confirmados são aceitos de novo sem duplicar.
+# Sessões paradas há mais de PUSH_SESSION_TTL_HOURS somem com `python -m app.migrate cleanup`.
+
+# tabelas push_sessions / leituras_staging: migration 0002 (app/migrate.py)
+LEITURA_COLS = list(LeituraIn.model_fields.keys())
+
+
+def _get_push_session(db, session_id: str, for_update: bool = False):
+    sql = "SELECT id, estaca_uuid, header, last_chunk, status FROM push_sessions WHERE id = :sid"
+    if for_update:
+        sql += " FOR UPDATE"
+    row = db.execute(text(sql), {"sid": session_id}).mappings().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Sessão de push não encontrada")
+    return row
+
+
+def _push_session_response(row) -> PushSessionResponse:
+    last_chunk = int(row["last_chunk"])
+    return PushSessionResponse(
+        ok=True,
+        session_id=row["id"],
+        uuid=row["estaca_uuid"],
+        status=row["status"],
+        last_chunk=last_chunk,
+        next_chunk=last_chunk + 1,
+    )
+
+
+def _copy_leituras_staging(db, session_id: str, chunk_seq: int, leituras) -> None:
+    # COPY direto na conexão psycopg da sessão (mesma transação)
+    raw = db.connection().connection.driver_connection
+    cols_sql = ", ".join(LEITURA_COLS)
+    with raw.cursor() as cur:
+        with cur.copy(
+            f"COPY leituras_staging (session_id, chunk_seq, {cols_sql}) FROM STDIN"
+        ) as copy:
+            for leitura in leituras:
+                d = leitura.model_dump()
+                copy.write_row([session_id, chunk_seq, *(d[c] for c in LEITURA_COLS)])
+
+
+@app.post("/sync/push/sessions", response_model=PushSessionResponse)
+def open_push_session(payload: PushSessionOpen, db: Session = Depends(get_db)):
+    est_uuid = str(payload.estaca.uuid)
+    header = payload.model_dump_json()
+
+    # conflito de versão / estaca existente aparece já aqui, não depois de todos os chunks
+    _check_ensaio_header(db, payload)
+
+    # retoma a sessão aberta da mesma estaca (upload interrompido) ou abre uma nova.
+    # Uma instrução só: o índice único parcial (migration 0002) garante uma sessão
+    # aberta por estaca mesmo com dois opens simultâneos.
+    row = db.execute(
+        text(
+            """
+            INSERT INTO push_sessions (id, estaca_uuid, header)
+            VALUES (:sid, :u, CAST(:h AS jsonb))
+            ON CONFLICT (estaca_uuid) WHERE status = 'open'
+            DO UPDATE SET header = EXCLUDED.header, updated_at = now()
+            RETURNING id, estaca_uuid, header, last_chunk, status
+            """
+        ),
+        {"sid": str(uuid4()), "u": est_uuid, "h": header},
+    ).mappings().first()
+
+    db.commit()
+    return _push_session_response(row)
+
+
+@app.get("/sync/push/sessions/{session_id}", response_model=PushSessionResponse)
+def get_push_session(session_id: UUID, db: Session = Depends(get_db)):
+    return _push_session_response(_get_push_session(db, str(session_id)))
+
+
+@app.put("/sync/push/sessions/{session_id}/chunks/{chunk_seq}", response_model=PushChunkResponse)
+def put_push_chunk(session_id: UUID, chunk_seq: int, payload: LeiturasChunk, db: Session = Depends(get_db)):
+    sid = str(session_id)
+    if chunk_seq < 0:
+        raise HTTPException(status_code=400, detail="chunk_seq deve ser >= 0")
+
+    # FOR UPDATE serializa chunks concorrentes da mesma sessão
+    sess = _get_push_session(db, sid, for_update=True)
+    last_chunk = int(sess["last_chunk"])
+
+    if sess["status"] != "open":
+        raise HTTPException(
+            status_code=409,
+            detail={"reason": "session_" + str(sess["status"]), "session_id": sid},
+        )
+
+    # reenvio de chunk já confirmado (resposta anterior se perdeu)
+    if chunk_seq <= last_chunk:
+        db.rollback()
+        return PushChunkResponse(
+            session_id=session_id,
+            chunk_seq=chunk_seq,
+            last_chunk=last_chunk,
+            next_chunk=last_chunk + 1,
+            duplicate=True,
+        )
+
+    if chunk_seq != last_chunk + 1:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "reason": "out_of_order",
+                "expected_chunk": last_chunk + 1,
+                "last_chunk": last_chunk,
+            },
+        )
+
+    _copy_leituras_staging(db, sid, chunk_seq, payload.leituras)
+
+    db.execute(
+        text(
+            """
+            UPDATE push_sessions
+            SET last_chunk = :seq, updated_at = now()
+            WHERE id = :sid
+            """
+        ),
+        {"seq": chunk_seq, "sid": sid},
+    )
+
+    db.commit()
+    return PushChunkResponse(
+        session_id=session_id,
+        chunk_seq=chunk_seq,
+        last_chunk=chunk_seq,
+        next_chunk=chunk_seq + 1,
+    )
+
+
+@app.post("/sync/push/sessions/{session_id}/commit")
+def commit_push_session(session_id: UUID, payload: Optional[PushSessionCommit] = None, db: Session = Depends(get_db)):
+    sid = str(session_id)
+
+    sess = _get_push_session(db, sid, for_update=True)
+    last_chunk = int(sess["last_chunk"])
+
+    # commit repetido (resposta anterior se perdeu)
+    if sess["status"] == "committed":
+        db.rollback()
+        return {"ok": True, "uuid": str(sess["estaca_uuid"]), "duplicate": True}
+
+    if sess["status"] != "open":
+        raise HTTPException(
+            status_code=409,
+            detail={"reason": "session_" + str(sess["status"]), "session_id": sid},
+        )
+
+    if payload and payload.total_chunks is not None and payload.total_chunks != last_chunk + 1:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "reason": "missing_chunks",
+                "total_chunks": payload.total_chunks,
+                "next_chunk": last_chunk + 1,
+            },
+        )
+
+    header = PushSessionOpen.model_validate(sess["header"])
+    estaca_id, est_uuid, versao = _upsert_ensaio_header(db, header)
+
+    # -------- Leituras (staging -> leituras) --------
+    db.execute(text("DELETE FROM leituras WHERE estaca_id = :eid"), {"eid": estaca_id})
+
+    cols_sql = ", ".join(LEITURA_COLS)
+    inserted = db.execute(
+        text(
+            f"""
+            INSERT INTO leituras (estaca_id, {cols_sql})
+            SELECT :eid, {cols_sql}
+            FROM leituras_staging
+            WHERE session_id = :sid
+            ORDER BY chunk_seq ASC, estagio ASC, row_ord ASC
+            """
+        ),
+        {"eid": estaca_id, "sid": sid},
+    ).rowcount
+
+    db.execute(text("DELETE FROM leituras_staging WHERE session_id = :sid"), {"sid": sid})
+    _refresh_ensaio_resumo(db, estaca_id)
+    db.execute(
+        text(
+            """
+            UPDATE push_sessions
+            SET status = 'committed', updated_at = now()
+            WHERE id = :sid
+            """
+        ),
+        {"sid": sid},
+    )
+
+    db.commit()
+    return {"ok": True, "uuid": est_uuid, "versao": versao, "leituras": int(inserted or 0)}
 
 
 # =====================================================
 # DUPLICAR ENSAIO (ESCRITÓRIO) - VERSIONAMENTO PERFEITO
 # =====================================================
 
-def _next_escritorio_label(db, uuid_origem: str) -> str:
-    rows = db.execute(
-        text("SELECT origem FROM estacas WHERE uuid_origem = :u"),
+def _next_revisao(db, uuid_origem: str) -> int:
+    """
+    Aloca a próxima revisão da família numa única instrução. O upsert trava só a
+    linha da família, então duplicações concorrentes nunca recebem o mesmo número.
+    """
+    return int(db.execute(
+        text(
+            """
+            INSERT INTO ensaio_familias (uuid_origem, ultima_revisao)
+            VALUES (:u, 0)
+            ON CONFLICT (uuid_origem) DO UPDATE
+                SET ultima_revisao = ensaio_familias.ultima_revisao + 1
+            RETURNING ultima_revisao
+            """
+        ),
         {"u": uuid_origem},
-    ).mappings().all()
+    ).scalar_one())
 
-    max_n = -1
-    for r in rows:
-        o = str(r.get("origem") or "")
-        m = re.search(r"(\d+)$", o.strip())
-        if m:
-            try:
-                max_n = max(max_n, int(m.group(1)))
-            except Exception:
-                pass
 
-    return f"Escritorio {max_n + 1:02d}"
+def _escritorio_label(revisao: int) -> str:
+    return f"Escritorio {revisao:02d}"
 
 
 @app.post("/ensaios/duplicar", response_model=DuplicarEnsaioResponse)
-def duplicar_ensaio(payload: DuplicarEnsaioRequest):
-    db = SessionLocal()
-    try:
-        original_uuid = str(payload.ensaio_uuid)
-
-        est_row = db.execute(
-            text("SELECT * FROM estacas WHERE uuid = :uuid LIMIT 1"),
-            {"uuid": original_uuid},
-        ).mappings().first()
-        if not est_row:
-            raise HTTPException(status_code=404, detail="Ensaio não encontrado")
+def duplicar_ensaio(payload: DuplicarEnsaioRequest, db: Session = Depends(get_db)):
+    original_uuid = str(payload.ensaio_uuid)
 
-        estaca_id_old = int(est_row["id"])
-        cliente_id_old = int(est_row["cliente_id"])
-
-        uuid_origem = str(est_row.get("uuid_origem") or original_uuid)
-        origem_label = _next_escritorio_label(db, uuid_origem)
+    est_row = db.execute(
+        text("SELECT * FROM estacas WHERE uuid = :uuid LIMIT 1"),
+        {"uuid": original_uuid},
+    ).mappings().first()
+    if not est_row:
+        raise HTTPException(status_code=404, detail="Ensaio não encontrado")
+
+    estaca_id_old = int(est_row["id"])
+    cliente_id_old = int(est_row["cliente_id"])
+
+    uuid_origem = str(est_row.get("uuid_origem") or original_uuid)
+    if not est_row.get("uuid_origem"):
+        # raiz antiga (sem uuid_origem): passa a fazer parte da própria família
+        db.execute(text("UPDATE estacas SET uuid_origem = uuid WHERE id = :id"), {"id": estaca_id_old})
+    revisao = _next_revisao(db, uuid_origem)
+    origem_label = _escritorio_label(revisao)
+
+    cli_row = db.execute(
+        text("SELECT * FROM clientes WHERE id = :id LIMIT 1"),
+        {"id": cliente_id_old},
+    ).mappings().first()
+    if not cli_row:
+        raise HTTPException(status_code=500, detail="Cliente do ensaio não encontrado")
+
+    cli_data = dict(cli_row)
+    cli_data.pop("id", None)
+
+    cli_cols = ", ".join(cli_data.keys())
+    cli_vals = ", ".join([f":{k}" for k in cli_data.keys()])
+    cliente_id_new = db.execute(
+        text(f"INSERT INTO clientes ({cli_cols}) VALUES ({cli_vals}) RETURNING id"),
+        cli_data,
+    ).scalar_one()
+
+    new_uuid = str(uuid4())
+    est_data = dict(est_row)
+    est_data.pop("id", None)
+
+    est_data["uuid"] = new_uuid
+    est_data["cliente_id"] = int(cliente_id_new)
+    est_data["uuid_origem"] = uuid_origem
+    est_data["origem"] = origem_label
+    est_data["revisao"] = revisao
+    if "versao" in est_data:
+        est_data["versao"] = 0
+
+    est_cols = ", ".join(est_data.keys())
+    est_vals = ", ".join([f":{k}" for k in est_data.keys()])
+    estaca_id_new = db.execute(
+        text(f"INSERT INTO estacas ({est_cols}) VALUES ({est_vals}) RETURNING id"),
+        est_data,
+    ).scalar_one()
+
+    eq_rows = db.execute(
+        text("SELECT * FROM equipamentos WHERE estaca_id = :eid ORDER BY id ASC"),
+        {"eid": estaca_id_old},
+    ).mappings().all()
 
-        cli_row = db.execute(
-            text("SELECT * FROM clientes WHERE id = :id LIMIT 1"),
-            {"id": cliente_id_old},
-        ).mappings().first()
-        if not cli_row:
-            raise HTTPException(status_code=500, detail="Cliente do ensaio não encontrado")
+    for eq in eq_rows:
+        eq_data = dict(eq)
+        eq_data.pop("id", None)
+        eq_data["estaca_id"] = int(estaca_id_new)
+        eq_cols = ", ".join(eq_data.keys())
+        eq_vals = ", ".join([f":{k}" for k in eq_data.keys()])
+        db.execute(text(f"INSERT INTO equipamentos ({eq_cols}) VALUES ({eq_vals})"), eq_data)
+
+    lt_rows = db.execute(
+        text("SELECT * FROM leituras WHERE estaca_id = :eid ORDER BY estagio ASC, row_ord ASC"),
+        {"eid": estaca_id_old},
+    ).mappings().all()
 
-        cli_data = dict(cli_row)
-        cli_data.pop("id", None)
+    for lt in lt_rows:
+        lt_data = dict(lt)
+        lt_data.pop("id", None)
+        lt_data["estaca_id"] = int(estaca_id_new)
+        if "versao" in lt_data:
+            lt_data["versao"] = 0
+        lt_cols = ", ".join(lt_data.keys())
+        lt_vals = ", ".join([f":{k}" for k in lt_data.keys()])
+        db.execute(text(f"INSERT INTO leituras ({lt_cols}) VALUES ({lt_vals})"), lt_data)
+
+    # recalculado das leituras que acabaram de ser copiadas: copiar o resumo da
+    # original poderia pegar um push feito nela entre a leitura e a cópia
+    _refresh_ensaio_resumo(db, estaca_id_new)
+
+    db.commit()
+    return DuplicarEnsaioResponse(
+        ok=True,
+        original_uuid=payload.ensaio_uuid,
+        novo_uuid=UUID(new_uuid),
+        origem=origem_label,
+        revisao=revisao,
+    )
 
-        cli_cols = ", ".join(cli_data.keys())
-        cli_vals = ", ".join([f":{k}" for k in cli_data.keys()])
-        cliente_id_new = db.execute(
-            text(f"INSERT INTO clientes ({cli_cols}) VALUES ({cli_vals}) RETURNING id"),
-            cli_data,
-        ).scalar_one()
 
-        new_uuid = str(uuid4())
-        est_data = dict(est_row)
-        est_data.pop("id", None)
+# =====================================================
+# VERSÕES (FAMÍLIA uuid_origem) - linhagem + diff de leituras em SQL
+# =====================================================
 
-        est_data["uuid"] = new_uuid
-        est_data["cliente_id"] = int(cliente_id_new)
-        est_data["uuid_origem"] = uuid_origem
-        est_data["origem"] = origem_label
+@app.get("/ensaios/{uuid}/versoes")
+def list_versoes(uuid: UUID, db: Session = Depends(get_db)):
+    est = db.execute(
+        text("SELECT uuid, uuid_origem FROM estacas WHERE uuid = :uuid LIMIT 1"),
+        {"uuid": str(uuid)},
+    ).mappings().first()
+    if not est:
+        raise HTTPException(status_code=404, detail="Ensaio não encontrado")
 
-        est_cols = ", ".join(est_data.keys())
-        est_vals = ", ".join([f":{k}" for k in est_data.keys()])
-        estaca_id_new = db.execute(
-            text(f"INSERT INTO estacas ({est_cols}) VALUES ({est_vals}) RETURNING id"),
-            est_data,
-        ).scalar_one()
+    uuid_origem = str(est["uuid_origem"] or est["uuid"])
 
-        eq_rows = db.execute(
-            text("SELECT * FROM equipamentos WHERE estaca_id = :eid ORDER BY id ASC"),
-            {"eid": estaca_id_old},
-        ).mappings().all()
+    # a raiz de famílias antigas pode ter uuid_origem NULL: entra pelo próprio uuid
+    versoes = db.execute(
+        text(
+            """
+            SELECT
+                e.id              AS estaca_id,
+                e.uuid            AS uuid,
+                e.origem          AS origem,
+                e.revisao         AS revisao,
+                e.versao          AS versao,
+                c.data_ensaio     AS data_ensaio,
+                COALESCE(r.n_leituras, 0) AS n_leituras
+            FROM estacas e
+            JOIN clientes c ON c.id = e.cliente_id
+            LEFT JOIN ensaio_resumo r ON r.estaca_id = e.id
+            WHERE e.uuid_origem = :u OR e.uuid = :u
+            ORDER BY e.revisao ASC NULLS FIRST, e.id ASC
+            """
+        ),
+        {"u": uuid_origem},
+    ).mappings().all()
 
-        for eq in eq_rows:
-            eq_data = dict(eq)
-            eq_data.pop("id", None)
-            eq_data["estaca_id"] = int(estaca_id_new)
-            eq_cols = ", ".join(eq_data.keys())
-            eq_vals = ", ".join([f":{k}" for k in eq_data.keys()])
-            db.execute(text(f"INSERT INTO equipamentos ({eq_cols}) VALUES ({eq_vals})"), eq_data)
-
-        lt_rows = db.execute(
-            text("SELECT * FROM leituras WHERE estaca_id = :eid ORDER BY estagio ASC, row_ord ASC"),
-            {"eid": estaca_id_old},
-        ).mappings().all()
+    # cada versão comparada com a anterior da família, casando por (estagio, row_ord);
+    # só as leituras incluídas, removidas ou com algum campo diferente voltam
+    diffs = db.execute(
+        text(
+            """
+            WITH fam AS (
+                SELECT
+                    e.id,
+                    lag(e.id) OVER (ORDER BY e.revisao ASC NULLS FIRST, e.id ASC) AS prev_id
+                FROM estacas e
+                WHERE e.uuid_origem = :u OR e.uuid = :u
+            )
+            SELECT
+                f.id AS estaca_id,
+                d.estagio,
+                d.row_ord,
+                CASE
+                    WHEN d.pj IS NULL THEN 'incluida'
+                    WHEN d.lj IS NULL THEN 'removida'
+                    ELSE 'alterada'
+                END AS tipo,
+                (
+                    SELECT jsonb_object_agg(
+                        k.key, jsonb_build_object('de', d.pj -> k.key, 'para', d.lj -> k.key)
+                    )
+                    FROM jsonb_object_keys(COALESCE(d.lj, d.pj)) AS k(key)
+                    WHERE (d.lj -> k.key) IS DISTINCT FROM (d.pj -> k.key)
+                ) AS campos
+            FROM fam f
+            CROSS JOIN LATERAL (
+                SELECT
+                    COALESCE(l.estagio, p.estagio) AS estagio,
+                    COALESCE(l.row_ord, p.row_ord) AS row_ord,
+                    CASE WHEN l.id IS NULL THEN NULL
+                         ELSE to_jsonb(l) - ARRAY['id', 'estaca_id', 'versao'] END AS lj,
+                    CASE WHEN p.id IS NULL THEN NULL
+                         ELSE to_jsonb(p) - ARRAY['id', 'estaca_id', 'versao'] END AS pj
+                FROM (SELECT * FROM leituras WHERE estaca_id = f.id) l
+                FULL JOIN (SELECT * FROM leituras WHERE estaca_id = f.prev_id) p
+                    ON p.estagio = l.estagio AND p.row_ord = l.row_ord
+            ) d
+            WHERE f.prev_id IS NOT NULL
+              AND d.lj IS DISTINCT FROM d.pj
+            ORDER BY f.id, d.estagio, d.row_ord
+            """
+        ),
+        {"u": uuid_origem},
+    ).mappings().all()
 
-        for lt in lt_rows:
-            lt_data = dict(lt)
-            lt_data.pop("id", None)
-            lt_data["estaca_id"] = int(estaca_id_new)
-            lt_cols = ", ".join(lt_data.keys())
-            lt_vals = ", ".join([f":{k}" for k in lt_data.keys()])
-            db.execute(text(f"INSERT INTO leituras ({lt_cols}) VALUES ({lt_vals})"), lt_data)
-
-        db.commit()
-        return DuplicarEnsaioResponse(
-            ok=True,
-            original_uuid=payload.ensaio_uuid,
-            novo_uuid=UUID(new_uuid),
-            origem=origem_label,
+    # agrupa numa passada
+    por_estaca = {}
+    for d in diffs:
+        por_estaca.setdefault(d["estaca_id"], []).append(
+            {"estagio": d["estagio"], "row_ord": d["row_ord"], "tipo": d["tipo"], "campos": d["campos"]}
         )
 
-    except HTTPException:
-        db.rollback()
-        raise
-    except Exception as e:
-        db.rollback()
-        print("ERROR /ensaios/duplicar:", repr(e), flush=True)
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+    out = []
+    anterior = None
+    for v in versoes:
+        item = dict(v)
+        item["base_uuid"] = anterior
+        item["alteracoes"] = por_estaca.get(v["estaca_id"], []) if anterior else []
+        out.append(item)
+        anterior = v["uuid"]
+
+    return {"uuid_origem": uuid_origem, "versoes": out}
 
 
 # =====================================================
@@ -583,111 +1315,81 @@ def duplicar_ensaio(payload: DuplicarEnsaioRequest):
 # =====================================================
 
 @app.get("/calibracoes")
-def list_calibracoes():
-    db = SessionLocal()
-    try:
-        rows = db.execute(
-            text(
-                """
-                SELECT id, cilindro, area_cm2, carga_maxima_tf
-                FROM calibracoes
-                ORDER BY cilindro ASC, id ASC
-                """
-            )
-        ).mappings().all()
-        return {"calibracoes": list(rows)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+def list_calibracoes(db: Session = Depends(get_db)):
+    rows = db.execute(
+        text(
+            """
+            SELECT id, cilindro, area_cm2, carga_maxima_tf
+            FROM calibracoes
+            ORDER BY cilindro ASC, id ASC
+            """
+        )
+    ).mappings().all()
+    return {"calibracoes": list(rows)}
 
 
 @app.post("/calibracoes")
-def create_calibracao(payload: CalibracaoIn):
-    db = SessionLocal()
-    try:
-        data = payload.model_dump()
-        cols = ", ".join(data.keys())
-        vals = ", ".join([f":{k}" for k in data.keys()])
-        new_id = db.execute(
-            text(f"INSERT INTO calibracoes ({cols}) VALUES ({vals}) RETURNING id"),
-            data,
-        ).scalar_one()
-        db.commit()
-        return {"id": new_id}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+def create_calibracao(payload: CalibracaoIn, db: Session = Depends(get_db)):
+    data = payload.model_dump()
+    cols = ", ".join(data.keys())
+    vals = ", ".join([f":{k}" for k in data.keys()])
+    new_id = db.execute(
+        text(f"INSERT INTO calibracoes ({cols}) VALUES ({vals}) RETURNING id"),
+        data,
+    ).scalar_one()
+    db.commit()
+    return {"id": new_id}
 
 
 @app.patch("/calibracoes/{cal_id}")
-def patch_calibracao(cal_id: int, payload: CalibracaoIn):
-    db = SessionLocal()
-    try:
-        data = payload.model_dump(exclude_none=True)
+def patch_calibracao(cal_id: int, payload: CalibracaoIn, db: Session = Depends(get_db)):
+    data = payload.model_dump(exclude_none=True)
 
-        # aceita PATCH parcial, mas mantém compatibilidade do seu frontend:
-        # ele envia cilindro/area/carga sempre.
-        if not data:
-            return {"ok": True}
-
-        set_clause = ", ".join([f"{k} = :{k}" for k in data.keys()])
-        data["id"] = cal_id
-        db.execute(text(f"UPDATE calibracoes SET {set_clause} WHERE id = :id"), data)
-        db.commit()
+    # aceita PATCH parcial, mas mantém compatibilidade do seu frontend:
+    # ele envia cilindro/area/carga sempre.
+    if not data:
         return {"ok": True}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+
+    set_clause = ", ".join([f"{k} = :{k}" for k in data.keys()])
+    data["id"] = cal_id
+    db.execute(text(f"UPDATE calibracoes SET {set_clause} WHERE id = :id"), data)
+    db.commit()
+    return {"ok": True}
 
 
 @app.delete("/calibracoes/{cal_id}")
-def delete_calibracao(cal_id: int):
-    db = SessionLocal()
-    try:
-        db.execute(text("DELETE FROM calibracoes WHERE id = :id"), {"id": cal_id})
-        db.commit()
-        return {"ok": True}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+def delete_calibracao(cal_id: int, db: Session = Depends(get_db)):
+    db.execute(text("DELETE FROM calibracoes WHERE id = :id"), {"id": cal_id})
+    db.commit()
+    return {"ok": True}
 
 
 @app.get("/leituras")
-def list_leituras(estaca_id: int):
-    db = SessionLocal()
-    try:
-        rows = db.execute(
-            text(
-                """
-                SELECT
-                    id,
-                    estaca_id,
-                    estagio, row_ord,
-                    carga_tf, pressao_kgf_cm2,
-                    horario, tempo_estagio, tempo_estagio_min, tempo_total,
-                    leitura_01, leitura_02, leitura_03, leitura_04,
-                    parcial_01, parcial_02, parcial_03, parcial_04,
-                    total_01, total_02, total_03, total_04,
-                    total_media, estabilizado, porcentagem,
-                    grafico, observacao,
-                    obrigatoria, is_referencia,
-                    ref_override_01, ref_override_02, ref_override_03, ref_override_04
-                FROM leituras
-                WHERE estaca_id = :eid
-                ORDER BY estagio ASC, row_ord ASC
-                """
-            ),
-            {"eid": int(estaca_id)},
-        ).mappings().all()
+def list_leituras(estaca_id: int, db: Session = Depends(get_db)):
+    rows = db.execute(
+        text(
+            """
+            SELECT
+                id,
+                estaca_id,
+                estagio, row_ord,
+                carga_tf, pressao_kgf_cm2,
+                horario, tempo_estagio, tempo_estagio_min, tempo_total,
+                leitura_01, leitura_02, leitura_03, leitura_04,
+                parcial_01, parcial_02, parcial_03, parcial_04,
+                total_01, total_02, total_03, total_04,
+                total_media, estabilizado, porcentagem,
+                grafico, observacao,
+                obrigatoria, is_referencia,
+                ref_override_01, ref_override_02, ref_override_03, ref_override_04,
+                versao
+            FROM leituras
+            WHERE estaca_id = :eid
+            ORDER BY estagio ASC, row_ord ASC
+            """
+        ),
+        {"eid": int(estaca_id)},
+    ).mappings().all()
 
-        # ✅ o grafico_page espera "data"
-        return {"data": list(rows)}
-    finally:
-        db.close()
+    # ✅ o grafico_page espera "data"
+    return {"data": list(rows)}
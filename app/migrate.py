@@ -0,0 +1,380 @@
+"""
+Migrations versionadas.
+
+    python -m app.migrate            # aplica o que falta (upgrade)
+    python -m app.migrate status     # lista aplicadas / pendentes
+    python -m app.migrate cleanup    # apaga sessões de push velhas + staging órfão
+
+Cada migration roda uma única vez e fica registrada em schema_migrations.
+Migrations com concurrent=True rodam em autocommit (CREATE INDEX CONCURRENTLY
+não pode rodar dentro de transação) e não bloqueiam escrita nas tabelas.
+"""
+import sys
+
+from sqlalchemy import text
+
+from app import db as db_module
+from app import models
+from app.config import get_int_env
+
+# lock de sessão: dois deploys ao mesmo tempo não aplicam a mesma migration
+_LOCK_KEY = "pce_api_migrate"
+
+
+def _create_base_tables(conn):
+    models.metadata.create_all(conn, tables=models.BASE_TABLES, checkfirst=True)
+
+
+def _create_push_session_tables(conn):
+    models.push_sessions.create(conn, checkfirst=True)
+    # no máximo uma sessão aberta por estaca: o open é um INSERT ... ON CONFLICT
+    conn.execute(
+        text(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_push_sessions_estaca_open
+                ON push_sessions (estaca_uuid)
+                WHERE status = 'open'
+            """
+        )
+    )
+    # mesmos tipos de leituras, sem id/estaca_id/constraints (destino do COPY)
+    cols_sql = ", ".join(
+        c.name for c in models.leituras.columns if c.name not in ("id", "estaca_id", "versao")
+    )
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS leituras_staging AS
+            SELECT NULL::uuid AS session_id, 0 AS chunk_seq, {cols_sql}
+            FROM leituras
+            WITH NO DATA
+            """
+        )
+    )
+    conn.execute(
+        text(
+            """
+            CREATE INDEX IF NOT EXISTS ix_leituras_staging_session
+                ON leituras_staging (session_id, chunk_seq)
+            """
+        )
+    )
+
+
+# (nome do índice, DDL) — filtros quentes de app/main.py
+HOT_INDEXES = [
+    # GET /ensaios/{uuid}, push, /leituras/batch, duplicar
+    # (não-único: bases antigas podem ter uuid repetido e o build falharia)
+    ("ix_estacas_uuid", "CREATE INDEX CONCURRENTLY ix_estacas_uuid ON estacas (uuid)"),
+    # família de versões (/ensaios/{uuid}/versoes)
+    ("ix_estacas_uuid_origem", "CREATE INDEX CONCURRENTLY ix_estacas_uuid_origem ON estacas (uuid_origem)"),
+    # _find_estaca_by_codigo_estaca (JOIN por cliente_id + estaca_num)
+    (
+        "ix_estacas_cliente_estaca_num",
+        "CREATE INDEX CONCURRENTLY ix_estacas_cliente_estaca_num ON estacas (cliente_id, estaca_num)",
+    ),
+    # leituras do ensaio, ORDER BY estagio, row_ord
+    (
+        "ix_leituras_estaca_estagio_ord",
+        "CREATE INDEX CONCURRENTLY ix_leituras_estaca_estagio_ord ON leituras (estaca_id, estagio, row_ord)",
+    ),
+    # upsert do cliente no push
+    (
+        "ix_clientes_codigo_obra_data",
+        "CREATE INDEX CONCURRENTLY ix_clientes_codigo_obra_data ON clientes (codigo_obra, data_ensaio)",
+    ),
+    # equipamento mais recente da estaca
+    (
+        "ix_equipamentos_estaca_id_desc",
+        "CREATE INDEX CONCURRENTLY ix_equipamentos_estaca_id_desc ON equipamentos (estaca_id, id DESC)",
+    ),
+    # calibração mais recente do cilindro
+    (
+        "ix_calibracoes_cilindro_id_desc",
+        "CREATE INDEX CONCURRENTLY ix_calibracoes_cilindro_id_desc ON calibracoes (cilindro, id DESC)",
+    ),
+]
+
+
+def create_index_concurrently(conn, name: str, ddl: str) -> None:
+    """
+    Cria o índice fora de transação. Se um build anterior falhou e deixou o
+    índice INVALID, derruba e recria; se já existe válido, não faz nada.
+    """
+    row = conn.execute(
+        text(
+            """
+            SELECT i.indisvalid AS valid
+            FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = :name AND c.relkind = 'i'
+            """
+        ),
+        {"name": name},
+    ).mappings().first()
+
+    if row is not None:
+        if row["valid"]:
+            return
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    conn.execute(text(ddl))
+
+
+def _create_hot_indexes(conn):
+    for name, ddl in HOT_INDEXES:
+        create_index_concurrently(conn, name, ddl)
+
+
+def _add_versao_columns(conn):
+    # DEFAULT constante não reescreve a tabela (PG 11+)
+    conn.execute(text("ALTER TABLE estacas ADD COLUMN IF NOT EXISTS versao integer NOT NULL DEFAULT 0"))
+    conn.execute(text("ALTER TABLE leituras ADD COLUMN IF NOT EXISTS versao integer NOT NULL DEFAULT 0"))
+
+
+def backfill_ensaio_resumo(conn, cliente_id=None) -> None:
+    """Recalcula ensaio_resumo a partir das leituras (todas as estacas ou só as de um cliente)."""
+    where = "WHERE e.cliente_id = :cid" if cliente_id is not None else ""
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO ensaio_resumo (
+                estaca_id, n_leituras, carga_max_tf, total_media_final,
+                ultimo_estagio, ultimo_estabilizado, estabilizado, atualizado_em
+            )
+            SELECT
+                e.id,
+                agg.n_leituras,
+                agg.carga_max_tf,
+                ult.total_media,
+                ult.estagio,
+                ult.estabilizado,
+                COALESCE(upper(left(trim(ult.estabilizado), 1)) = 'S', false),
+                now()
+            FROM estacas e
+            CROSS JOIN LATERAL (
+                SELECT count(*) AS n_leituras, max(l.carga_tf) AS carga_max_tf
+                FROM leituras l
+                WHERE l.estaca_id = e.id
+            ) agg
+            LEFT JOIN LATERAL (
+                SELECT l.total_media, l.estagio, l.estabilizado
+                FROM leituras l
+                WHERE l.estaca_id = e.id
+                ORDER BY l.estagio DESC, l.row_ord DESC
+                LIMIT 1
+            ) ult ON true
+            {where}
+            ON CONFLICT (estaca_id) DO UPDATE SET
+                n_leituras = EXCLUDED.n_leituras,
+                carga_max_tf = EXCLUDED.carga_max_tf,
+                total_media_final = EXCLUDED.total_media_final,
+                ultimo_estagio = EXCLUDED.ultimo_estagio,
+                ultimo_estabilizado = EXCLUDED.ultimo_estabilizado,
+                estabilizado = EXCLUDED.estabilizado,
+                atualizado_em = EXCLUDED.atualizado_em
+            """
+        ),
+        {"cid": cliente_id} if cliente_id is not None else {},
+    )
+
+
+def _create_ensaio_resumo(conn):
+    models.ensaio_resumo.create(conn, checkfirst=True)
+    # backfill único (depois disso as escritas da API mantêm a tabela)
+    backfill_ensaio_resumo(conn)
+
+
+def _add_revisao(conn):
+    conn.execute(text("ALTER TABLE estacas ADD COLUMN IF NOT EXISTS revisao integer"))
+    models.ensaio_familias.create(conn, checkfirst=True)
+
+    # revisão = número no fim do rótulo ("Escritorio 03" -> 3), como o antigo
+    # _next_escritorio_label calculava. Rótulos repetidos (corrida de duplicações
+    # antigas) ficam só no menor id; os demais ficam com revisao NULL.
+    conn.execute(
+        text(
+            r"""
+            WITH parsed AS (
+                SELECT
+                    id,
+                    uuid_origem,
+                    substring(origem from '(\d+)\s*$')::int AS n
+                FROM estacas
+                WHERE uuid_origem IS NOT NULL
+                  AND origem ~ '\d+\s*$'
+                  AND revisao IS NULL
+            ),
+            ranked AS (
+                SELECT id, n, row_number() OVER (PARTITION BY uuid_origem, n ORDER BY id) AS rn
+                FROM parsed
+            )
+            UPDATE estacas e
+            SET revisao = ranked.n
+            FROM ranked
+            WHERE ranked.id = e.id AND ranked.rn = 1
+            """
+        )
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO ensaio_familias (uuid_origem, ultima_revisao)
+            SELECT uuid_origem, max(revisao)
+            FROM estacas
+            WHERE uuid_origem IS NOT NULL AND revisao IS NOT NULL
+            GROUP BY uuid_origem
+            ON CONFLICT (uuid_origem) DO UPDATE
+                SET ultima_revisao = GREATEST(ensaio_familias.ultima_revisao, EXCLUDED.ultima_revisao)
+            """
+        )
+    )
+
+
+def _create_revisao_unique_index(conn):
+    create_index_concurrently(
+        conn,
+        "ux_estacas_uuid_origem_revisao",
+        "CREATE UNIQUE INDEX CONCURRENTLY ux_estacas_uuid_origem_revisao ON estacas (uuid_origem, revisao)",
+    )
+
+
+# (versão, nome, concurrent, função)
+MIGRATIONS = [
+    (1, "base_tables", False, _create_base_tables),
+    (2, "push_sessions", False, _create_push_session_tables),
+    (3, "hot_indexes", True, _create_hot_indexes),
+    (4, "versao_columns", False, _add_versao_columns),
+    (5, "ensaio_resumo", False, _create_ensaio_resumo),
+    (6, "revisao", False, _add_revisao),
+    (7, "revisao_unique_index", True, _create_revisao_unique_index),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version    integer PRIMARY KEY,
+                name       text NOT NULL,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+
+
+def _applied_versions(conn) -> set:
+    rows = conn.execute(text("SELECT version FROM schema_migrations")).all()
+    return {int(r[0]) for r in rows}
+
+
+def _record(conn, version: int, name: str) -> None:
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+        {"v": version, "n": name},
+    )
+
+
+def upgrade(engine=None) -> list:
+    """Aplica as migrations pendentes em ordem. Retorna as versões aplicadas."""
+    engine = engine or db_module.init_engine()
+    applied_now = []
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text("SELECT pg_advisory_lock(hashtext(:k))"), {"k": _LOCK_KEY})
+        try:
+            _ensure_version_table(conn)
+            done = _applied_versions(conn)
+
+            for version, name, concurrent, fn in MIGRATIONS:
+                if version in done:
+                    continue
+
+                if concurrent:
+                    # autocommit: cada statement é sua própria transação
+                    fn(conn)
+                    _record(conn, version, name)
+                else:
+                    with engine.begin() as tx:
+                        fn(tx)
+                        _record(tx, version, name)
+
+                print(f"migration {version:04d} {name}: ok", flush=True)
+                applied_now.append(version)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:k))"), {"k": _LOCK_KEY})
+
+    return applied_now
+
+
+def status(engine=None) -> list:
+    engine = engine or db_module.init_engine()
+    with engine.connect() as conn:
+        _ensure_version_table(conn)
+        conn.commit()
+        done = _applied_versions(conn)
+    return [(v, n, v in done) for v, n, _c, _f in MIGRATIONS]
+
+
+def cleanup(engine=None, ttl_hours=None) -> dict:
+    """
+    Apaga sessões de push sem atividade há mais de PUSH_SESSION_TTL_HOURS (abertas
+    e abandonadas pelo app, ou já commitadas) e as linhas de staging delas, além de
+    staging sem sessão. O app que voltar com um session_id apagado recebe 404 e
+    reabre a sessão.
+    """
+    engine = engine or db_module.init_engine()
+    ttl = ttl_hours if ttl_hours is not None else get_int_env("PUSH_SESSION_TTL_HOURS", 48)
+
+    with engine.begin() as conn:
+        sessions = conn.execute(
+            text(
+                """
+                DELETE FROM push_sessions
+                WHERE updated_at < now() - make_interval(hours => :ttl)
+                RETURNING id
+                """
+            ),
+            {"ttl": int(ttl)},
+        ).scalars().all()
+        staging = conn.execute(
+            text(
+                """
+                DELETE FROM leituras_staging s
+                WHERE NOT EXISTS (SELECT 1 FROM push_sessions p WHERE p.id = s.session_id)
+                """
+            )
+        ).rowcount
+
+    return {"push_sessions": len(sessions), "leituras_staging": int(staging or 0)}
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cmd = argv[0] if argv else "upgrade"
+
+    if cmd == "upgrade":
+        applied = upgrade()
+        if not applied:
+            print("nada a aplicar", flush=True)
+        return 0
+
+    if cmd == "status":
+        for version, name, ok in status():
+            print(f"{version:04d} {name}: {'aplicada' if ok else 'pendente'}")
+        return 0
+
+    if cmd == "cleanup":
+        removed = cleanup()
+        print(f"removidos: {removed['push_sessions']} sessões de push, {removed['leituras_staging']} linhas de staging")
+        return 0
+
+    print(f"comando desconhecido: {cmd} (use upgrade | status | cleanup)", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+"""
+Tabelas do banco (SQLAlchemy Core).
+
+A API continua usando SQL explícito (text()); estes modelos servem para as
+migrations (app/migrate.py) e para criar um Postgres local do zero.
+"""
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+metadata = MetaData()
+
+
+clientes = Table(
+    "clientes",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("codigo_obra", Text, nullable=False),
+    Column("data_ensaio", Text),
+    Column("cliente_nome", Text),
+    Column("resp_obra", Text),
+    Column("tec_cedro", Text),
+    Column("endereco", Text),
+    Column("cidade", Text),
+    Column("sondagem", Text),
+)
+
+estacas = Table(
+    "estacas",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("uuid", UUID(as_uuid=False), nullable=False),
+    Column("uuid_origem", UUID(as_uuid=False)),
+    Column("origem", Text),
+    Column("cliente_id", Integer, ForeignKey("clientes.id"), nullable=False),
+    Column("carregamento", Text),
+    Column("estaca_num", Text),
+    Column("tipo_estaca", Text),
+    Column("diametro_cm", Float),
+    Column("profundidade_m", Float),
+    Column("carga_adm_tf", Float),
+    Column("carga_ensaio_tf", Float),
+    # controle de concorrência otimista (migration 0004)
+    Column("versao", Integer, nullable=False, server_default="0"),
+    # número da cópia do escritório na família uuid_origem (NULL = campo) (migration 0006)
+    Column("revisao", Integer),
+)
+
+equipamentos = Table(
+    "equipamentos",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("estaca_id", Integer, ForeignKey("estacas.id"), nullable=False),
+    Column("leitura", Text),
+    Column("cilindro_serie", Text),
+    Column("cilindro_area_cm2", Float),
+    Column("celula_serie", Text),
+    Column("lvdt_serie01", Text),
+    Column("lvdt_serie02", Text),
+    Column("lvdt_serie03", Text),
+    Column("lvdt_serie04", Text),
+)
+
+calibracoes = Table(
+    "calibracoes",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("cilindro", Text, nullable=False),
+    Column("area_cm2", Float),
+    Column("carga_maxima_tf", Float),
+)
+
+leituras = Table(
+    "leituras",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("estaca_id", Integer, ForeignKey("estacas.id"), nullable=False),
+    Column("estagio", Text, nullable=False),
+    Column("row_ord", Integer, nullable=False),
+    Column("carga_tf", Float),
+    Column("pressao_kgf_cm2", Float),
+    Column("horario", Text),
+    Column("tempo_estagio", Float),
+    Column("tempo_estagio_min", Float),
+    Column("tempo_total", Text),
+    Column("leitura_01", Float),
+    Column("leitura_02", Float),
+    Column("leitura_03", Float),
+    Column("leitura_04", Float),
+    Column("parcial_01", Float),
+    Column("parcial_02", Float),
+    Column("parcial_03", Float),
+    Column("parcial_04", Float),
+    Column("total_01", Float),
+    Column("total_02", Float),
+    Column("total_03", Float),
+    Column("total_04", Float),
+    Column("total_media", Float),
+    Column("estabilizado", Text),
+    Column("porcentagem", Float),
+    Column("grafico", Text),
+    Column("observacao", Text),
+    Column("obrigatoria", Integer),
+    Column("is_referencia", Integer),
+    Column("ref_override_01", Integer),
+    Column("ref_override_02", Integer),
+    Column("ref_override_03", Integer),
+    Column("ref_override_04", Integer),
+    Column("versao", Integer, nullable=False, server_default="0"),
+)
+
+# push em sessão (chunks) — ver /sync/push/sessions em app/main.py
+push_sessions = Table(
+    "push_sessions",
+    metadata,
+    Column("id", UUID(as_uuid=False), primary_key=True),
+    Column("estaca_uuid", UUID(as_uuid=False), nullable=False),
+    Column("header", JSONB, nullable=False),
+    Column("last_chunk", Integer, nullable=False, server_default="-1"),
+    Column("status", Text, nullable=False, server_default="open"),
+    Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+# resumo por ensaio mantido pelas escritas (migration 0005) — listagens e
+# dashboards leem daqui em vez de varrer leituras
+ensaio_resumo = Table(
+    "ensaio_resumo",
+    metadata,
+    Column("estaca_id", Integer, ForeignKey("estacas.id", ondelete="CASCADE"), primary_key=True),
+    Column("n_leituras", Integer, nullable=False, server_default="0"),
+    Column("carga_max_tf", Float),
+    Column("total_media_final", Float),
+    Column("ultimo_estagio", Text),
+    Column("ultimo_estabilizado", Text),
+    Column("estabilizado", Boolean, nullable=False, server_default="false"),
+    Column("atualizado_em", DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+# contador de revisões por família (uuid_origem) — alocação atômica no duplicar
+ensaio_familias = Table(
+    "ensaio_familias",
+    metadata,
+    Column("uuid_origem", UUID(as_uuid=False), primary_key=True),
+    Column("ultima_revisao", Integer, nullable=False),
+)
+
+# tabelas que já existem em produção (migration 0001 só cria se faltar)
+BASE_TABLES = [clientes, estacas, equipamentos, calibracoes, leituras]
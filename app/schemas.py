@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 from pydantic import BaseModel
 
@@ -150,6 +150,7 @@ class LeituraIn(BaseModel):
 
 class PushPayload(BaseModel):
     overwrite: bool = False
+    versao_esperada: Optional[int] = None  # versão da estaca que o campo tinha; None = sem checagem
     cliente: ClienteIn
     estaca: EstacaIn
     equipamento: Optional[EquipamentoIn] = None
@@ -159,16 +160,27 @@ class PushPayload(BaseModel):
 class LeituraBatchItem(BaseModel):
     leitura_id: int
     patch: LeituraPatch
+    versao_esperada: Optional[int] = None  # versão da leitura; None = sem checagem
 
 
 class LeiturasBatchRequest(BaseModel):
     ensaio_uuid: UUID
     items: List[LeituraBatchItem]
+    versao_esperada: Optional[int] = None  # versão da estaca; None = sem checagem
 
 
 class LeiturasBatchResponse(BaseModel):
     ok: bool = True
     updated: int = 0
+    versao: Optional[int] = None  # nova versão da estaca
+    leituras_versao: Dict[int, int] = {}  # leitura_id -> nova versão
+
+
+class EnsaiosBatchGetRequest(BaseModel):
+    # informe uuids OU codigo_obra
+    uuids: Optional[List[UUID]] = None
+    codigo_obra: Optional[str] = None
+    stream: bool = False  # True = NDJSON, um documento por linha
 
 
 class DuplicarEnsaioRequest(BaseModel):
@@ -180,3 +192,43 @@ class DuplicarEnsaioResponse(BaseModel):
     original_uuid: UUID
     novo_uuid: UUID
     origem: str  # ex: "Escritorio 00"
+    revisao: Optional[int] = None  # número da cópia na família (00 -> 0)
+
+
+# ==========================
+# PUSH EM SESSÃO (CHUNKS)
+# ==========================
+
+class PushSessionOpen(BaseModel):
+    overwrite: bool = False
+    versao_esperada: Optional[int] = None
+    cliente: ClienteIn
+    estaca: EstacaIn
+    equipamento: Optional[EquipamentoIn] = None
+
+
+class PushSessionResponse(BaseModel):
+    ok: bool = True
+    session_id: UUID
+    uuid: UUID
+    status: str  # "open" | "committed"
+    last_chunk: int = -1  # -1 = nenhum chunk confirmado
+    next_chunk: int = 0
+
+
+class LeiturasChunk(BaseModel):
+    leituras: List[LeituraIn]
+
+
+class PushChunkResponse(BaseModel):
+    ok: bool = True
+    session_id: UUID
+    chunk_seq: int
+    last_chunk: int
+    next_chunk: int
+    duplicate: bool = False  # chunk já confirmado antes (reenvio)
+
+
+class PushSessionCommit(BaseModel):
+    # opcional: o cliente informa quantos chunks enviou, para validar antes de trocar
+    total_chunks: Optional[int] = None
@@ -0,0 +1,158 @@
+"""
+Entrypoint de produção.
+
+    python -m app.server                 # workers = núcleos disponíveis
+    python -m app.server --workers 4
+
+Cada worker é um processo uvicorn independente (uvloop + httptools) com seu
+próprio engine/pool; o único estado compartilhado é o Postgres. O pool de cada
+worker é dimensionado para que workers x (pool_size + max_overflow) caiba no
+orçamento de conexões desta instância: DB_CONNECTION_BUDGET, ou
+(max_connections - reservadas) / DB_INSTANCES. Com várias instâncias (réplicas,
+autoscaling), DB_INSTANCES deve ser o máximo de instâncias simultâneas — senão
+a soma dos pools passa do max_connections do servidor.
+
+Se o banco não responder no boot, usa DB_MAX_CONNECTIONS ou um padrão
+conservador (100, o default do Postgres) e sobe mesmo assim; /health?ready=1
+acusa o banco fora.
+
+No SIGTERM o uvicorn para de aceitar conexões e espera os requests em andamento
+(ex.: pushes) terminarem, até GRACEFUL_TIMEOUT segundos; depois o lifespan
+fecha o pool.
+
+Variáveis: PORT, HOST, WEB_CONCURRENCY, GRACEFUL_TIMEOUT, DB_MAX_CONNECTIONS,
+DB_RESERVED_CONNECTIONS, DB_CONNECTION_BUDGET, DB_INSTANCES, DB_POOL_SIZE,
+DB_MAX_OVERFLOW, DB_CONNECT_TIMEOUT.
+"""
+import argparse
+import importlib.util
+import os
+
+from app.config import get_env, get_int_env
+
+
+def available_cpus() -> int:
+    """Núcleos realmente disponíveis (affinity + cota do cgroup v2 em containers)."""
+    try:
+        n = len(os.sched_getaffinity(0))
+    except AttributeError:
+        n = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            n = min(n, max(1, int(int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, n)
+
+
+# max_connections padrão do Postgres: usado quando o banco não responde no boot
+DEFAULT_MAX_CONNECTIONS = 100
+
+
+def server_max_connections() -> int:
+    """max_connections do Postgres (DB_MAX_CONNECTIONS evita a consulta)."""
+    configured = get_int_env("DB_MAX_CONNECTIONS", 0)
+    if configured:
+        return configured
+
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    database_url = get_env("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL não definida")
+
+    engine = create_engine(
+        database_url,
+        poolclass=NullPool,
+        connect_args={"connect_timeout": get_int_env("DB_CONNECT_TIMEOUT", 5)},
+    )
+    try:
+        with engine.connect() as conn:
+            return int(conn.execute(text("SHOW max_connections")).scalar_one())
+    except Exception as e:
+        # banco fora no boot não impede subir (mesma regra do lifespan)
+        print(
+            f"server: aviso: max_connections indisponível ({e!r}); usando {DEFAULT_MAX_CONNECTIONS}",
+            flush=True,
+        )
+        return DEFAULT_MAX_CONNECTIONS
+    finally:
+        engine.dispose()
+
+
+def size_pools(workers: int, max_connections: int) -> dict:
+    """
+    Divide o orçamento de conexões desta instância entre os workers. Retorna
+    pool_size, max_overflow e o total que pode ser aberto por esta instância.
+    """
+    reserved = get_int_env("DB_RESERVED_CONNECTIONS", 10)
+    instances = max(1, get_int_env("DB_INSTANCES", 1))
+    budget = get_int_env("DB_CONNECTION_BUDGET", 0) or (max_connections - reserved) // instances
+    per_worker = budget // workers
+    if per_worker < 1:
+        raise RuntimeError(
+            f"orçamento de {budget} conexões não comporta {workers} workers "
+            f"(max_connections={max_connections}, reservadas={reserved}, instâncias={instances})"
+        )
+
+    # 2/3 fixas no pool, o resto como overflow para picos
+    pool_size = max(1, (per_worker * 2) // 3)
+    max_overflow = per_worker - pool_size
+
+    # valores explícitos só podem reduzir
+    pool_size = min(pool_size, get_int_env("DB_POOL_SIZE", pool_size))
+    max_overflow = min(max_overflow, get_int_env("DB_MAX_OVERFLOW", max_overflow))
+
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "total": workers * (pool_size + max_overflow),
+        "budget": budget,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=get_int_env("WEB_CONCURRENCY", 0) or available_cpus())
+    ap.add_argument("--host", default=get_env("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=get_int_env("PORT", 8000))
+    ap.add_argument("--graceful-timeout", type=int, default=get_int_env("GRACEFUL_TIMEOUT", 30))
+    args = ap.parse_args(argv)
+
+    pools = size_pools(args.workers, server_max_connections())
+
+    # os workers herdam o ambiente: app.db.init_engine lê estes valores
+    os.environ["DB_POOL_SIZE"] = str(pools["pool_size"])
+    os.environ["DB_MAX_OVERFLOW"] = str(pools["max_overflow"])
+    os.environ["DB_WARMUP_CONNECTIONS"] = str(
+        min(get_int_env("DB_WARMUP_CONNECTIONS", 2), pools["pool_size"])
+    )
+
+    print(
+        f"server: {args.workers} workers, pool {pools['pool_size']}+{pools['max_overflow']} por worker "
+        f"({pools['total']}/{pools['budget']} conexões)",
+        flush=True,
+    )
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+        http="httptools" if importlib.util.find_spec("httptools") else "auto",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+"""
+Benchmark de cold start da API.
+
+Mede, em processos novos (como num container recém-criado):
+  - tempo de `import app.main`
+  - tempo do spawn do uvicorn até o primeiro 200 em /health, /health?ready=1 e /ensaios
+
+Uso:
+    DATABASE_URL=postgresql+psycopg://... python -m bench.cold_start --runs 5 --out cold_start.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+PROBES = ["/health", "/health?ready=1", "/ensaios"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(runs: int) -> list:
+    out = []
+    for _ in range(runs):
+        res = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        out.append(float(res.stdout.strip().splitlines()[-1]))
+    return out
+
+
+def wait_ok(url: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resp:
+                if resp.status == 200:
+                    resp.read()
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def measure_first_requests(timeout: float) -> dict:
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = t0 + timeout
+        result = {}
+        for path in PROBES:
+            ok = wait_ok(f"http://127.0.0.1:{port}{path}", deadline)
+            result[path] = (time.perf_counter() - t0) if ok else None
+        return result
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _summary(values: list) -> dict:
+    vals = [v for v in values if v is not None]
+    if not vals:
+        return {"n": 0}
+    return {
+        "n": len(vals),
+        "min_s": min(vals),
+        "median_s": statistics.median(vals),
+        "max_s": max(vals),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--timeout", type=float, default=30.0, help="segundos por run até desistir")
+    ap.add_argument("--out", help="grava o resultado em JSON")
+    args = ap.parse_args(argv)
+
+    if not os.getenv("DATABASE_URL"):
+        print("aviso: DATABASE_URL não definida (usa .env se existir)", file=sys.stderr)
+
+    imports = measure_import(args.runs)
+    firsts = [measure_first_requests(args.timeout) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import_app_main": _summary(imports),
+        "time_to_first_ok": {p: _summary([f[p] for f in firsts]) for p in PROBES},
+        "raw": {"import": imports, "first_ok": firsts},
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
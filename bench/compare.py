@@ -0,0 +1,62 @@
+"""
+Compara dois resultados de bench.load e aponta regressões.
+
+    python -m bench.compare antes.json depois.json [--threshold 10]
+
+Sai com código 1 se algum endpoint piorou mais que --threshold % em p95 ou
+throughput, ou se passou a fazer mais queries por request.
+"""
+import argparse
+import json
+
+
+def _pct(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(before: dict, after: dict, threshold: float) -> int:
+    regressions = 0
+    print(f"{'endpoint':24s} {'rps':>18s} {'p95 ms':>18s} {'q/req':>12s}")
+    for name, new in after.get("endpoints", {}).items():
+        old = before.get("endpoints", {}).get(name)
+        if not old:
+            print(f"{name:24s} (novo)")
+            continue
+
+        d_rps = _pct(old["throughput_rps"], new["throughput_rps"])
+        d_p95 = _pct(old["p95_ms"], new["p95_ms"])
+        more_queries = (new["queries_per_request"] or 0) > (old["queries_per_request"] or 0)
+
+        flag = ""
+        if (d_rps is not None and d_rps < -threshold) or (d_p95 is not None and d_p95 > threshold) or more_queries:
+            flag = "  <-- regressão"
+            regressions += 1
+
+        print(
+            f"{name:24s} "
+            f"{old['throughput_rps']:>7} -> {new['throughput_rps']:<8} "
+            f"{old['p95_ms']:>7} -> {new['p95_ms']:<8} "
+            f"{old['queries_per_request']:>4} -> {new['queries_per_request']:<5}"
+            f"{flag}"
+        )
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("before")
+    ap.add_argument("after")
+    ap.add_argument("--threshold", type=float, default=10.0, help="tolerância em %%")
+    args = ap.parse_args(argv)
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    return compare(before, after, args.threshold)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
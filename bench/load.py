@@ -0,0 +1,252 @@
+"""
+Benchmark end-to-end dos endpoints, direto no app ASGI (sem rede).
+
+Para cada cenário dispara --requests chamadas com --concurrency em paralelo e
+mede throughput, p50/p95/p99 e queries SQL por request. O resultado vai em JSON
+para comparar execuções (python -m bench.compare antes.json depois.json).
+
+    pip install -r bench/requirements.txt
+    DATABASE_URL=... python -m bench.seed --obras 200 --leituras-por-estaca 500
+    DATABASE_URL=... python -m bench.load --requests 500 --concurrency 16 --out results.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import event, text
+
+from app import db as db_module
+from bench.seed import LEITURA_COLS, PREFIX, gen_leituras
+
+# contador de queries do request corrente (o contexto é copiado para o threadpool)
+_query_counter = contextvars.ContextVar("bench_query_counter", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def percentile(sorted_values: list, p: float):
+    if not sorted_values:
+        return None
+    # nearest-rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class Fixtures:
+    """Amostra de uuids / ids do banco semeado para montar os requests."""
+
+    def __init__(self, engine, sample: int = 500):
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT e.id, e.uuid, c.codigo_obra
+                    FROM estacas e
+                    JOIN clientes c ON c.id = e.cliente_id
+                    WHERE c.codigo_obra LIKE :p
+                    ORDER BY random()
+                    LIMIT :n
+                    """
+                ),
+                {"p": PREFIX + "%", "n": sample},
+            ).mappings().all()
+            if not rows:
+                raise SystemExit("banco sem dados BENCH-: rode python -m bench.seed antes")
+
+            self.estacas = [(int(r["id"]), str(r["uuid"])) for r in rows]
+            self.obras = sorted({r["codigo_obra"] for r in rows})
+            self.leituras = {}
+            for eid, u in self.estacas[:100]:
+                ids = conn.execute(
+                    text("SELECT id FROM leituras WHERE estaca_id = :eid ORDER BY row_ord LIMIT 20"),
+                    {"eid": eid},
+                ).scalars().all()
+                if ids:
+                    self.leituras[u] = [int(i) for i in ids]
+
+
+def _push_payload(rng: random.Random, n_leituras: int) -> dict:
+    u = str(uuid.uuid4())
+    leituras = []
+    for r in gen_leituras(rng, 0, n_leituras, 200.0, 400.0):
+        d = dict(zip(LEITURA_COLS, r))
+        d.pop("estaca_id")
+        leituras.append(d)
+    return {
+        "overwrite": False,
+        "cliente": {"codigo_obra": f"{PREFIX}PUSH", "data_ensaio": "2025-06-01", "cliente_nome": "Bench"},
+        "estaca": {"uuid": u, "estaca_num": f"P-{u[:8]}", "carga_ensaio_tf": 200.0},
+        "equipamento": {"cilindro_serie": f"{PREFIX}CIL000", "cilindro_area_cm2": 400.0},
+        "leituras": leituras,
+    }
+
+
+def build_scenarios(fx: Fixtures, rng: random.Random, push_leituras: int) -> dict:
+    """nome -> função que devolve (método, url, json) para um request."""
+
+    def ensaio_uuid():
+        return rng.choice(fx.estacas)[1]
+
+    def leituras_batch():
+        u = rng.choice(list(fx.leituras))
+        ids = rng.sample(fx.leituras[u], k=min(5, len(fx.leituras[u])))
+        items = [{"leitura_id": i, "patch": {"observacao": f"bench {rng.randint(0, 9999)}"}} for i in ids]
+        return "POST", "/leituras/batch", {"ensaio_uuid": u, "items": items}
+
+    return {
+        "GET /ensaios": lambda: ("GET", "/ensaios", None),
+        "GET /ensaios/{uuid}": lambda: ("GET", f"/ensaios/{ensaio_uuid()}", None),
+        "POST /ensaios/batch-get": lambda: (
+            "POST", "/ensaios/batch-get", {"uuids": [u for _e, u in rng.sample(fx.estacas, min(20, len(fx.estacas)))]}
+        ),
+        "GET /leituras": lambda: ("GET", f"/leituras?estaca_id={rng.choice(fx.estacas)[0]}", None),
+        "POST /leituras/batch": leituras_batch,
+        "POST /sync/push": lambda: ("POST", "/sync/push", _push_payload(rng, push_leituras)),
+        "GET /obras/{codigo_obra}/resumo": lambda: ("GET", f"/obras/{rng.choice(fx.obras)}/resumo", None),
+        "POST /ensaios/duplicar": lambda: ("POST", "/ensaios/duplicar", {"ensaio_uuid": ensaio_uuid()}),
+    }
+
+
+async def run_scenario(client, make_request, n: int, concurrency: int) -> dict:
+    latencies = []
+    queries = []
+    errors = 0
+    status_counts = {}
+    sem = asyncio.Semaphore(concurrency)
+    # monta os requests antes para não medir geração de payload
+    reqs = [make_request() for _ in range(n)]
+
+    async def one(method, url, body):
+        nonlocal errors
+        async with sem:
+            counter = [0]
+            token = _query_counter.set(counter)
+            t = time.perf_counter()
+            try:
+                resp = await client.request(method, url, json=body)
+                code = resp.status_code
+            except Exception:
+                code = "exc"
+            finally:
+                latencies.append((time.perf_counter() - t) * 1000)
+                _query_counter.reset(token)
+            queries.append(counter[0])
+            status_counts[str(code)] = status_counts.get(str(code), 0) + 1
+            if code == "exc" or code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(*r) for r in reqs))
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": n,
+        "concurrency": concurrency,
+        "errors": errors,
+        "status": status_counts,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n / wall, 2) if wall else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _scale(engine) -> dict:
+    with engine.connect() as conn:
+        return {
+            t: conn.execute(text(f"SELECT count(*) FROM {t}")).scalar_one()
+            for t in ("clientes", "estacas", "equipamentos", "calibracoes", "leituras")
+        }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "endpoints": {},
+    }
+
+    # ASGITransport não roda o lifespan: roda aqui (engine + warmup)
+    async with app.router.lifespan_context(app):
+        engine = db_module.engine
+        event.listen(engine, "before_cursor_execute", _count_query)
+        try:
+            report["meta"]["scale"] = _scale(engine)
+            fx = Fixtures(engine)
+            scenarios = build_scenarios(fx, rng, args.push_leituras)
+            selected = args.only or list(scenarios)
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name in selected:
+                    # aquecimento curto fora da medição
+                    await run_scenario(client, scenarios[name], min(args.concurrency, args.requests), args.concurrency)
+                    res = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+                    report["endpoints"][name] = res
+                    print(
+                        f"{name:24s} {res['throughput_rps']:>9} req/s  "
+                        f"p50 {res['p50_ms']}ms  p95 {res['p95_ms']}ms  p99 {res['p99_ms']}ms  "
+                        f"q/req {res['queries_per_request']}  erros {res['errors']}",
+                        flush=True,
+                    )
+        finally:
+            event.remove(engine, "before_cursor_execute", _count_query)
+
+    return report
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200, help="requests por cenário")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--push-leituras", type=int, default=200, help="leituras por payload de /sync/push")
+    ap.add_argument("--only", action="append", help="roda só este cenário (pode repetir)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="grava o resultado em JSON")
+    args = ap.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"resultado em {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
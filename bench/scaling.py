@@ -0,0 +1,175 @@
+"""
+Benchmark de escala por workers no caminho de leitura GET /ensaios/{uuid}.
+
+Sobe `python -m app.server --workers W` para cada W, aplica carga HTTP real
+(TCP) por --duration segundos e mede req/s e latências. A eficiência é
+rps(W) / (W x rps(1)) — perto de 1.0 = escala linear.
+
+    DATABASE_URL=... python -m bench.seed
+    DATABASE_URL=... python -m bench.scaling --workers 1 2 4 8 --connections 64 --client-procs 4 --out scaling.json
+
+O gerador de carga também usa CPU: um único processo asyncio satura um núcleo
+bem antes de 8 workers. --client-procs divide as conexões entre N processos
+(latências somadas numa distribuição só) e o relatório traz o CPU gasto pelo
+cliente; client_cpu_util perto de 1.0 = cliente no limite, o resultado mede o
+cliente e não a API (aumente --client-procs ou deixe núcleos livres para ele).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import subprocess
+import sys
+import time
+
+from app import db as db_module
+from bench.cold_start import free_port, wait_ok
+from bench.load import Fixtures, percentile
+
+
+async def drive(base_url: str, uuids: list, connections: int, duration: float, seed: int) -> dict:
+    """Carga num processo só. Retorna as amostras cruas (latências em ms, erros, wall)."""
+    import httpx
+
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t = time.perf_counter()
+                try:
+                    resp = await client.get(f"/ensaios/{rng.choice(uuids)}")
+                    ok = resp.status_code == 200
+                except Exception:
+                    ok = False
+                latencies.append((time.perf_counter() - t) * 1000)
+                if not ok:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(connections)))
+        wall = time.perf_counter() - t0
+
+    return {"latencies": latencies, "errors": errors, "wall_s": wall}
+
+
+def _drive_process(base_url: str, uuids: list, connections: int, duration: float, seed: int) -> dict:
+    # alvo do Pool: mede o CPU (user + sys) que este processo gastou gerando carga
+    cpu0 = time.process_time()
+    res = asyncio.run(drive(base_url, uuids, connections, duration, seed))
+    res["cpu_s"] = time.process_time() - cpu0
+    return res
+
+
+def run_load(base_url: str, uuids: list, connections: int, duration: float, seed: int, procs: int = 1) -> dict:
+    """Divide as conexões entre `procs` processos e junta as amostras num resultado só."""
+    procs = max(1, min(procs, connections))
+    share = [connections // procs + (1 if i < connections % procs else 0) for i in range(procs)]
+    jobs = [(base_url, uuids, share[i], duration, seed + i) for i in range(procs)]
+
+    if procs == 1:
+        parts = [_drive_process(*jobs[0])]
+    else:
+        # spawn: cada processo sobe limpo (sem loop/sockets herdados do pai)
+        with multiprocessing.get_context("spawn").Pool(procs) as pool:
+            parts = pool.starmap(_drive_process, jobs)
+
+    latencies = sorted(lat for p in parts for lat in p["latencies"])
+    n = len(latencies)
+    wall = max(p["wall_s"] for p in parts)
+    cpu = sum(p["cpu_s"] for p in parts)
+    return {
+        "requests": n,
+        "errors": sum(p["errors"] for p in parts),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n / wall, 2) if wall else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if n else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if n else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if n else None,
+        "client_procs": procs,
+        "client_cpu_s": round(cpu, 3),
+        # fração dos núcleos do cliente ocupada (1.0 = todos os processos a 100%)
+        "client_cpu_util": round(cpu / (wall * procs), 3) if wall else None,
+    }
+
+
+def run_with_workers(workers: int, args, uuids: list) -> dict:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_ok(base_url + "/health?ready=1", time.perf_counter() + 60):
+            raise RuntimeError(f"servidor com {workers} workers não ficou pronto")
+        # aquecimento: todos os workers recebem requests e abrem o pool
+        run_load(base_url, uuids, args.connections, min(3.0, args.duration), args.seed, args.client_procs)
+        return run_load(base_url, uuids, args.connections, args.duration, args.seed, args.client_procs)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--connections", type=int, default=64, help="conexões HTTP simultâneas")
+    ap.add_argument("--duration", type=float, default=15.0, help="segundos de carga por rodada")
+    ap.add_argument("--client-procs", type=int, default=1, help="processos geradores de carga")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="grava o resultado em JSON")
+    args = ap.parse_args(argv)
+
+    fx = Fixtures(db_module.init_engine())
+    uuids = [u for _eid, u in fx.estacas]
+    db_module.dispose_engine()
+
+    results = {}
+    for w in sorted(set(args.workers)):
+        res = run_with_workers(w, args, uuids)
+        results[w] = res
+        print(
+            f"workers={w:<3d} {res['throughput_rps']:>10} req/s  p50 {res['p50_ms']}ms  p99 {res['p99_ms']}ms"
+            f"  cpu cliente {res['client_cpu_util']}",
+            flush=True,
+        )
+        if res["client_cpu_util"] and res["client_cpu_util"] > 0.9:
+            print(f"  aviso: cliente no limite de CPU com workers={w}; use mais --client-procs", flush=True)
+
+    base = results.get(1) or results[min(results)]
+    base_w = 1 if 1 in results else min(results)
+    per_worker = base["throughput_rps"] / base_w if base["throughput_rps"] else None
+    for w, res in results.items():
+        res["efficiency"] = (
+            round(res["throughput_rps"] / (w * per_worker), 3) if per_worker and res["throughput_rps"] else None
+        )
+
+    report = {
+        "endpoint": "GET /ensaios/{uuid}",
+        "connections": args.connections,
+        "client_procs": args.client_procs,
+        "duration_s": args.duration,
+        "workers": {str(w): r for w, r in results.items()},
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
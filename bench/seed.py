@@ -0,0 +1,233 @@
+"""
+Gerador de dados sintéticos para benchmark.
+
+Cria obras (clientes), estacas, equipamentos, calibrações e leituras realistas
+num Postgres local, via COPY (escala até milhões de leituras). Tudo que é gerado
+usa codigo_obra com prefixo BENCH- e pode ser apagado com --reset.
+
+    DATABASE_URL=... python -m bench.seed --obras 200 --estacas-por-obra 10 --leituras-por-estaca 500
+"""
+import argparse
+import random
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app import db as db_module
+from app import migrate
+
+PREFIX = "BENCH-"
+
+CIDADES = ["São Paulo", "Campinas", "Santos", "Curitiba", "Belo Horizonte", "Rio de Janeiro"]
+TIPOS_ESTACA = ["Hélice contínua", "Escavada", "Raiz", "Pré-moldada", "Strauss"]
+CARREGAMENTOS = ["Compressão", "Tração", "Horizontal"]
+
+LEITURA_COLS = [
+    "estaca_id", "estagio", "row_ord",
+    "carga_tf", "pressao_kgf_cm2",
+    "horario", "tempo_estagio", "tempo_estagio_min", "tempo_total",
+    "leitura_01", "leitura_02", "leitura_03", "leitura_04",
+    "parcial_01", "parcial_02", "parcial_03", "parcial_04",
+    "total_01", "total_02", "total_03", "total_04",
+    "total_media", "estabilizado", "porcentagem",
+    "grafico", "observacao",
+    "obrigatoria", "is_referencia",
+    "ref_override_01", "ref_override_02", "ref_override_03", "ref_override_04",
+]
+
+ESTACA_COLS = [
+    "uuid", "uuid_origem", "origem", "cliente_id",
+    "carregamento", "estaca_num", "tipo_estaca",
+    "diametro_cm", "profundidade_m", "carga_adm_tf", "carga_ensaio_tf",
+]
+
+EQUIP_COLS = [
+    "estaca_id", "leitura", "cilindro_serie", "cilindro_area_cm2", "celula_serie",
+    "lvdt_serie01", "lvdt_serie02", "lvdt_serie03", "lvdt_serie04",
+]
+
+# tempos de leitura dentro de cada estágio (min), como no ensaio lento
+TEMPOS_ESTAGIO = [0, 1, 2, 4, 8, 15, 30, 60, 90, 120]
+
+
+def gen_leituras(rng: random.Random, estaca_id: int, n: int, carga_ensaio: float, area_cm2: float):
+    """Gera n leituras em estágios de carga (10% da carga de ensaio cada) e descarga."""
+    n_estagios = max(1, min(10, n // len(TEMPOS_ESTAGIO) or 1))
+    rows = []
+    recalque = 0.0
+    total_min = 0.0
+    ref = [rng.uniform(10.0, 40.0) for _ in range(4)]
+
+    for i in range(n):
+        est_idx = min(i // len(TEMPOS_ESTAGIO), n_estagios * 2 - 1) if n_estagios else 0
+        carregando = est_idx < n_estagios
+        frac = (est_idx + 1) / n_estagios if carregando else max(0.0, 1 - (est_idx - n_estagios + 1) / n_estagios)
+        estagio = f"{'C' if carregando else 'D'}{(est_idx % n_estagios) + 1:02d}"
+        t = TEMPOS_ESTAGIO[i % len(TEMPOS_ESTAGIO)]
+        total_min += 1 if t == 0 else t - TEMPOS_ESTAGIO[(i % len(TEMPOS_ESTAGIO)) - 1]
+
+        carga = round(carga_ensaio * frac, 2)
+        recalque += rng.uniform(0.0, 0.05) if carregando else -rng.uniform(0.0, 0.03)
+        leit = [round(r + recalque + rng.gauss(0, 0.005), 3) for r in ref]
+        parc = [round(v - r, 3) for v, r in zip(leit, ref)]
+        media = round(sum(parc) / 4, 3)
+
+        rows.append((
+            estaca_id, estagio, i,
+            carga, round(carga * 1000 / area_cm2, 2) if area_cm2 else None,
+            f"{(8 + int(total_min // 60)) % 24:02d}:{int(total_min % 60):02d}", float(t), float(t),
+            f"{int(total_min // 60):02d}:{int(total_min % 60):02d}",
+            *leit,
+            *parc,
+            *parc,
+            media, "S" if t >= 30 else "N", round(frac * 100, 1),
+            "S", None,
+            1 if t in (0, 30) else 0, 1 if i == 0 else 0,
+            None, None, None, None,
+        ))
+    return rows
+
+
+def _copy(raw, table: str, cols: list, rows) -> None:
+    with raw.cursor() as cur:
+        with cur.copy(f"COPY {table} ({', '.join(cols)}) FROM STDIN") as copy:
+            for r in rows:
+                copy.write_row(r)
+
+
+def reset(engine) -> None:
+    with engine.begin() as conn:
+        ids = "SELECT e.id FROM estacas e JOIN clientes c ON c.id = e.cliente_id WHERE c.codigo_obra LIKE :p"
+        conn.execute(text(f"DELETE FROM leituras WHERE estaca_id IN ({ids})"), {"p": PREFIX + "%"})
+        conn.execute(text(f"DELETE FROM equipamentos WHERE estaca_id IN ({ids})"), {"p": PREFIX + "%"})
+        conn.execute(
+            text("DELETE FROM estacas WHERE cliente_id IN (SELECT id FROM clientes WHERE codigo_obra LIKE :p)"),
+            {"p": PREFIX + "%"},
+        )
+        conn.execute(text("DELETE FROM clientes WHERE codigo_obra LIKE :p"), {"p": PREFIX + "%"})
+        conn.execute(text("DELETE FROM calibracoes WHERE cilindro LIKE :p"), {"p": PREFIX + "%"})
+
+
+def seed(
+    obras: int,
+    estacas_por_obra: int,
+    leituras_por_estaca: int,
+    calibracoes: int = 20,
+    seed_value: int = 42,
+) -> dict:
+    rng = random.Random(seed_value)
+    engine = db_module.init_engine()
+    migrate.upgrade(engine)
+
+    t0 = time.perf_counter()
+    counts = {"clientes": 0, "estacas": 0, "equipamentos": 0, "calibracoes": 0, "leituras": 0}
+
+    cilindros = []
+    with engine.begin() as conn:
+        raw = conn.connection.driver_connection
+        cal_rows = []
+        for i in range(calibracoes):
+            cil = f"{PREFIX}CIL{i:03d}"
+            area = round(rng.uniform(150.0, 700.0), 2)
+            cilindros.append((cil, area))
+            cal_rows.append((cil, area, round(area * rng.uniform(0.4, 0.8), 1)))
+        _copy(raw, "calibracoes", ["cilindro", "area_cm2", "carga_maxima_tf"], cal_rows)
+        counts["calibracoes"] = len(cal_rows)
+
+    # uma transação por obra: mantém memória baixa mesmo em milhões de leituras
+    for o in range(obras):
+        codigo_obra = f"{PREFIX}{o:05d}"
+        data_ensaio = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+        with engine.begin() as conn:
+            raw = conn.connection.driver_connection
+            cliente_id = conn.execute(
+                text(
+                    """
+                    INSERT INTO clientes (codigo_obra, data_ensaio, cliente_nome, resp_obra, tec_cedro, endereco, cidade, sondagem)
+                    VALUES (:codigo_obra, :data_ensaio, :cliente_nome, :resp_obra, :tec_cedro, :endereco, :cidade, :sondagem)
+                    RETURNING id
+                    """
+                ),
+                {
+                    "codigo_obra": codigo_obra,
+                    "data_ensaio": data_ensaio,
+                    "cliente_nome": f"Construtora {o:05d}",
+                    "resp_obra": f"Eng. Responsável {rng.randint(1, 50)}",
+                    "tec_cedro": f"Técnico {rng.randint(1, 10)}",
+                    "endereco": f"Rua {rng.randint(1, 999)}",
+                    "cidade": rng.choice(CIDADES),
+                    "sondagem": f"SP-{rng.randint(1, 20):02d}",
+                },
+            ).scalar_one()
+            counts["clientes"] += 1
+
+            est_rows = []
+            for k in range(estacas_por_obra):
+                u = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                carga_adm = round(rng.uniform(30.0, 300.0), 1)
+                est_rows.append((
+                    u, u, "campo", cliente_id,
+                    rng.choice(CARREGAMENTOS), f"E{k + 1:03d}", rng.choice(TIPOS_ESTACA),
+                    rng.choice([30.0, 40.0, 50.0, 60.0, 80.0]), round(rng.uniform(6.0, 30.0), 1),
+                    carga_adm, round(carga_adm * 2, 1),
+                ))
+            _copy(raw, "estacas", ESTACA_COLS, est_rows)
+            counts["estacas"] += len(est_rows)
+
+            id_rows = conn.execute(
+                text("SELECT id, uuid, carga_ensaio_tf FROM estacas WHERE cliente_id = :cid"),
+                {"cid": cliente_id},
+            ).mappings().all()
+
+            eq_rows = []
+            lt_rows = []
+            for r in id_rows:
+                cil, area = rng.choice(cilindros)
+                eq_rows.append((
+                    int(r["id"]), "Manual", cil, area, f"CEL{rng.randint(1, 30):03d}",
+                    *(f"LVDT{rng.randint(1, 99):03d}" for _ in range(4)),
+                ))
+                lt_rows.extend(
+                    gen_leituras(rng, int(r["id"]), leituras_por_estaca, float(r["carga_ensaio_tf"]), area)
+                )
+            _copy(raw, "equipamentos", EQUIP_COLS, eq_rows)
+            _copy(raw, "leituras", LEITURA_COLS, lt_rows)
+            # COPY não passa pela API: o resumo (listagens/dashboard) é montado aqui
+            migrate.backfill_ensaio_resumo(conn, cliente_id)
+            counts["equipamentos"] += len(eq_rows)
+            counts["leituras"] += len(lt_rows)
+
+        if (o + 1) % max(1, obras // 10) == 0:
+            print(f"  {o + 1}/{obras} obras, {counts['leituras']} leituras", flush=True)
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text("ANALYZE"))
+
+    counts["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    return counts
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--obras", type=int, default=50)
+    ap.add_argument("--estacas-por-obra", type=int, default=10)
+    ap.add_argument("--leituras-por-estaca", type=int, default=200)
+    ap.add_argument("--calibracoes", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--reset", action="store_true", help="apaga os dados BENCH- antes de gerar")
+    args = ap.parse_args(argv)
+
+    if args.reset:
+        reset(db_module.init_engine())
+        print("dados BENCH- apagados", flush=True)
+
+    counts = seed(args.obras, args.estacas_por_obra, args.leituras_por_estaca, args.calibracoes, args.seed)
+    print(counts, flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
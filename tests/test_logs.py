@@ -0,0 +1,37 @@
+import logging
+import sys
+
+from app.logs import RateLimitFilter
+
+
+def _record(path: str) -> logging.LogRecord:
+    try:
+        raise ConnectionError("banco fora")
+    except ConnectionError:
+        exc_info = sys.exc_info()
+    return logging.getLogger("pce_api").makeRecord(
+        "pce_api",
+        logging.ERROR,
+        __file__,
+        0,
+        "erro não tratado em %s %s",
+        ("GET", "/ensaios/{uuid}"),
+        exc_info,
+        extra={"route": "/ensaios/{uuid}", "path": path},
+    )
+
+
+def test_mesma_rota_com_paths_diferentes_vira_uma_chave():
+    f = RateLimitFilter(burst=5, window=60, sample_every=100)
+    passed = sum(f.filter(_record(f"/ensaios/{i:08d}")) for i in range(1000))
+    # rajada de 5 + 1 a cada 100 dos 995 restantes
+    assert passed == 5 + 995 // 100
+    assert len(f._state) == 1
+
+
+def test_rotas_diferentes_nao_se_suprimem():
+    f = RateLimitFilter(burst=1, window=60, sample_every=1000)
+    a = _record("/ensaios/1")
+    b = _record("/ensaios/1/versoes")
+    b.route = "/ensaios/{uuid}/versoes"
+    assert f.filter(a) and f.filter(b)